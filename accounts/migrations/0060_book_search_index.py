@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0059_delete_bookstatus_remove_cart_created_at_str_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS book_search USING fts5("
+                "title, author, publisher, description, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            ),
+            reverse_sql="DROP TABLE IF EXISTS book_search",
+        ),
+    ]
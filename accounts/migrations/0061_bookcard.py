@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0060_book_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCard',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='accounts.book')),
+                ('title', models.CharField(max_length=255)),
+                ('author_name', models.CharField(max_length=255)),
+                ('genre_name', models.CharField(max_length=100)),
+                ('publisher_name', models.CharField(max_length=255)),
+                ('year_published', models.IntegerField()),
+                ('status', models.CharField(max_length=25)),
+                ('featured', models.CharField(max_length=25)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('discounted_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('effective_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('discount_percent', models.PositiveSmallIntegerField(default=0)),
+                ('image_url', models.CharField(blank=True, max_length=500)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.author')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.genre')),
+                ('publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.publisher')),
+            ],
+        ),
+    ]
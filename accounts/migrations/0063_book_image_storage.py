@@ -0,0 +1,17 @@
+import library.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0062_book_image_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=library.storage.book_image_storage, upload_to='books/'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0064_book_neighbour'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='accounts.book')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'book', 'quantity'], name='sales_day_book_idx')],
+                'unique_together': {('book', 'day')},
+            },
+        ),
+    ]
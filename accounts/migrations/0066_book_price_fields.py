@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+def fill_price_fields(apps, schema_editor):
+    Book = apps.get_model('accounts', 'Book')
+    rows = []
+    for pk, price, discounted in (Book.objects.exclude(price=None)
+                                  .values_list('pk', 'price', 'discounted_price').iterator(chunk_size=2000)):
+        if discounted and price > discounted:
+            rows.append((discounted, round(100 - (discounted / price * 100)), pk))
+        else:
+            rows.append((price, 0, pk))
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {Book._meta.db_table} SET effective_price = %s, discount_percent = %s WHERE book_id = %s',
+            rows,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0065_book_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='discount_percent',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['discount_percent'], name='book_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['effective_price'], name='book_effective_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['-discount_percent', '-book_id'], name='card_discount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['effective_price', 'book_id'], name='card_price_idx'),
+        ),
+        migrations.RunPython(fill_price_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0066_book_price_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-year_published', '-book_id'], name='book_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['genre', '-year_published', '-book_id'], name='book_genre_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', '-year_published', '-book_id'], name='book_author_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['status', '-year_published', '-book_id'], name='book_status_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['featured', '-year_published', '-book_id'], name='book_featured_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['-year_published', '-book_id'], name='card_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['genre', '-year_published', '-book_id'], name='card_genre_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['author', '-year_published', '-book_id'], name='card_author_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['status', '-year_published', '-book_id'], name='card_status_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcard',
+            index=models.Index(fields=['featured', '-year_published', '-book_id'], name='card_featured_year_idx'),
+        ),
+    ]
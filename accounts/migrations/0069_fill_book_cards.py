@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def fill_book_cards(apps, schema_editor):
+    # صفحات لیست فقط از BookCard می‌خوانند؛ بدون این مرحله کاتالوگ بعد از migrate خالی است
+    # کد برنامه (library.cards) عمداً استفاده نشده تا تغییرات بعدی آن این migration را نشکند
+    Book = apps.get_model('accounts', 'Book')
+    BookCard = apps.get_model('accounts', 'BookCard')
+    books = Book.objects.select_related('author', 'genre', 'publisher').order_by('pk')
+    batch = []
+    for book in books.iterator(chunk_size=2000):
+        batch.append(BookCard(
+            book_id=book.pk,
+            title=book.title,
+            author_id=book.author_id,
+            author_name=book.author.name,
+            genre_id=book.genre_id,
+            genre_name=book.genre.name,
+            publisher_id=book.publisher_id,
+            publisher_name=book.publisher.name,
+            year_published=book.year_published,
+            status=book.status,
+            featured=book.featured,
+            price=book.price,
+            discounted_price=book.discounted_price,
+            effective_price=book.effective_price,
+            discount_percent=book.discount_percent,
+            image_url=book.image.url if book.image else '',
+            image_hash=book.image_hash,
+            description=book.description,
+        ))
+        if len(batch) >= 2000:
+            BookCard.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        BookCard.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0068_cacheversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_book_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0069_fill_book_cards'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=accounts.models.book_image_storage, upload_to='books/'),
+        ),
+    ]
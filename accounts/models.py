@@ -3,9 +3,15 @@ from sys import maxsize
 from django.db import models
 from django.contrib.auth.models import BaseUserManager, PermissionsMixin, AbstractUser
 from django.conf import settings
+from django.core.files.storage import storages
 from django_jalali.db import models as jmodels
 
 
+def book_image_storage():
+    # کلاس ذخیره‌سازی از تنظیمات STORAGES['book_images'] خوانده می‌شود
+    return storages['book_images']
+
+
 class CustomUserManager(BaseUserManager):
     def get_by_natural_key(self, username):
         return self.get(**{self.model.USERNAME_FIELD: username})
@@ -113,15 +119,78 @@ class Book(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     discounted_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     description = models.TextField(max_length=500 , blank=True , null=True )
-    image = models.ImageField(upload_to='books/', blank=True , null=True )
+    image = models.ImageField(upload_to='books/', storage=book_image_storage, blank=True , null=True )
+    image_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     featured = models.CharField(choices=STATUSS , default='normal', max_length=25)
+    # قیمت نهایی و درصد تخفیف ذخیره می‌شوند تا فیلتر و مرتب‌سازی با ایندکس در دیتابیس انجام شود
+    effective_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    discount_percent = models.PositiveSmallIntegerField(default=0, editable=False)
 
+    class Meta:
+        # هر فیلتر صفحه‌ی کتاب‌ها ستون اول یک ایندکس است و ترتیب پیش‌فرض (سال، id) پشت آن می‌آید
+        indexes = [
+            models.Index(fields=['-year_published', '-book_id'], name='book_year_idx'),
+            models.Index(fields=['genre', '-year_published', '-book_id'], name='book_genre_year_idx'),
+            models.Index(fields=['author', '-year_published', '-book_id'], name='book_author_year_idx'),
+            models.Index(fields=['status', '-year_published', '-book_id'], name='book_status_year_idx'),
+            models.Index(fields=['featured', '-year_published', '-book_id'], name='book_featured_year_idx'),
+            models.Index(fields=['discount_percent'], name='book_discount_idx'),
+            models.Index(fields=['effective_price'], name='book_effective_price_idx'),
+        ]
 
     def discount_percentage(self):
         if self.discounted_price and self.price > self.discounted_price:
             return round(100 - (self.discounted_price / self.price * 100))
         return 0
 
+    def update_price_fields(self):
+        # برای مسیرهای bulk که save صدا زده نمی‌شود هم استفاده می‌شود
+        on_sale = bool(self.discounted_price and self.price and self.price > self.discounted_price)
+        self.effective_price = self.discounted_price if on_sale else self.price
+        self.discount_percent = self.discount_percentage() if on_sale else 0
+
+    def save(self, *args, **kwargs):
+        self.update_price_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discounted_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price', 'discount_percent'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.title
+
+class BookCard(models.Model):
+    # نسخه‌ی غیرنرمال کتاب برای صفحات لیست؛ بدون join خوانده می‌شود و با سیگنال‌ها به‌روز می‌ماند
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=255)
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='+')
+    author_name = models.CharField(max_length=255)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='+')
+    genre_name = models.CharField(max_length=100)
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name='+')
+    publisher_name = models.CharField(max_length=255)
+    year_published = models.IntegerField()
+    status = models.CharField(max_length=25)
+    featured = models.CharField(max_length=25)
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    discounted_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    effective_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    discount_percent = models.PositiveSmallIntegerField(default=0)
+    image_url = models.CharField(max_length=500, blank=True)
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+    description = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-year_published', '-book_id'], name='card_year_idx'),
+            models.Index(fields=['genre', '-year_published', '-book_id'], name='card_genre_year_idx'),
+            models.Index(fields=['author', '-year_published', '-book_id'], name='card_author_year_idx'),
+            models.Index(fields=['status', '-year_published', '-book_id'], name='card_status_year_idx'),
+            models.Index(fields=['featured', '-year_published', '-book_id'], name='card_featured_year_idx'),
+            models.Index(fields=['-discount_percent', '-book_id'], name='card_discount_idx'),
+            models.Index(fields=['effective_price', 'book_id'], name='card_price_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -221,3 +290,42 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} × {self.product.title}"
 
+
+
+class BookNeighbour(models.Model):
+    # k کتابی که بیشتر از همه همراه این کتاب در سفارش‌های تکمیل‌شده خریده شده‌اند
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('book', 'neighbour')
+        indexes = [models.Index(fields=['book', '-score'], name='neighbour_book_score_idx')]
+
+    def __str__(self):
+        return f"{self.book_id} → {self.neighbour_id} ({self.score})"
+
+
+class BookSales(models.Model):
+    # جمع فروش روزانه‌ی هر کتاب از سفارش‌های تکمیل‌شده؛ پرفروش‌ترین‌ها از این جدول خوانده می‌شوند
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('book', 'day')
+        indexes = [models.Index(fields=['day', 'book', 'quantity'], name='sales_day_book_idx')]
+
+    def __str__(self):
+        return f"{self.book_id} @ {self.day}: {self.quantity}"
+
+
+class CacheVersion(models.Model):
+    # نسخه‌ی داده‌ی هر مدل برای کلید کش؛ در دیتابیس است تا همه‌ی workerها و دستورهای مدیریتی یکی را ببینند
+    label = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.label}: {self.version}"
@@ -11,6 +11,7 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.core.mail import send_mail
 from .utils import generate_token, verify_token, send_verification_email
+from library import sales
 
 def register(request):
     if request.method == "POST":
@@ -129,9 +130,16 @@ def profile(request, email):
 
 
 def best_selling_books(request):
-    best_sellers = Book.objects.filter(status="sold").order_by("-price")[:5]
-
-    return render(request, "books/best_sellers.html", {"best_sellers": best_sellers})
+    try:
+        days = int(request.GET.get("days", sales.DEFAULT_WINDOW))
+    except ValueError:
+        days = sales.DEFAULT_WINDOW
+    if days not in sales.WINDOWS:
+        days = sales.DEFAULT_WINDOW
+    best_sellers = sales.best_sellers(days, limit=5)
+
+    return render(request, "books/best_sellers.html",
+                  {"best_sellers": best_sellers, "days": days, "windows": sales.WINDOWS})
 
 def generate_token(email):
     serializer = URLSafeTimedSerializer(settings.SECRET_KEY)
@@ -0,0 +1,44 @@
+from django.utils.decorators import method_decorator
+from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import Author, Book, Genre, Publisher
+from .cache import catalog_condition
+from .serializers import AuthorSerializer, BookSerializer, GenreSerializer, PublisherSerializer
+
+
+class CatalogCursorPagination(CursorPagination):
+    # ترتیب بر اساس کلید اصلی؛ برای همگام‌سازی کامل کاتالوگ پایدار و بدون OFFSET است
+    ordering = 'pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+@method_decorator(catalog_condition, name='dispatch')
+class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
+    pagination_class = CatalogCursorPagination
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer]
+
+
+class BookViewSet(CatalogViewSet):
+    queryset = Book.objects.select_related('author', 'genre', 'publisher')
+    serializer_class = BookSerializer
+
+
+class AuthorViewSet(CatalogViewSet):
+    queryset = Author.objects.all()
+    serializer_class = AuthorSerializer
+
+
+class GenreViewSet(CatalogViewSet):
+    queryset = Genre.objects.all()
+    serializer_class = GenreSerializer
+
+
+class PublisherViewSet(CatalogViewSet):
+    queryset = Publisher.objects.all()
+    serializer_class = PublisherSerializer
@@ -0,0 +1,126 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+from django.db.models import Sum
+
+from accounts.models import BookCard, BookSales
+from .cache import get_versions
+from .search import normalize
+
+DEPENDS_ON = ('book', 'author')
+MAX_RESULTS = 20
+# بازه‌های بزرگ‌تر از این (پیشوندهای کوتاه) یک بار مرتب و نتیجه‌شان نگه داشته می‌شود
+SCAN_LIMIT = 256
+MEMO_SIZE = 10000
+# نسخه‌ی کاتالوگ حداکثر هر چند ثانیه یک بار بررسی می‌شود تا هر کلید به دیتابیس نرود
+CHECK_INTERVAL = 5
+
+BOOK = 'book'
+AUTHOR = 'author'
+
+
+class PrefixIndex:
+    """
+    Sorted array of (normalized key, entry position) pairs. Every word of a
+    title or author name starts a key, so "potter" finds "harry potter" too;
+    the matches of a prefix are the contiguous slice found with bisect.
+    Entries are given best first, so ranking a slice is picking its smallest
+    positions.
+    """
+
+    def __init__(self, entries):
+        # entries: (type, id, label, author name)
+        self.entries = entries
+        pairs = []
+        for position, entry in enumerate(entries):
+            words = normalize(entry[2]).split()
+            for i in range(len(words)):
+                pairs.append((' '.join(words[i:]), position))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+        self.memo = {}
+
+    def _ranked(self, lo, hi, limit):
+        # یک مدخل ممکن است با چند کلمه‌اش در بازه باشد
+        return heapq.nsmallest(limit, set(self.positions[lo:hi]))
+
+    def lookup(self, text, limit=8):
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\uffff', lo)
+        if hi - lo <= SCAN_LIMIT:
+            positions = self._ranked(lo, hi, limit)
+        else:
+            positions = self.memo.get(prefix)
+            if positions is None:
+                if len(self.memo) >= MEMO_SIZE:
+                    self.memo.clear()
+                positions = self.memo[prefix] = self._ranked(lo, hi, MAX_RESULTS)
+            positions = positions[:limit]
+        return [self.entries[p] for p in positions]
+
+
+def _load_entries():
+    sold = dict(
+        BookSales.objects.values('book_id').annotate(total=Sum('quantity'))
+        .values_list('book_id', 'total')
+    )
+    ranked = []
+    authors = {}
+    rows = BookCard.objects.values_list('book_id', 'title', 'author_id', 'author_name', 'featured')
+    for book_id, title, author_id, author_name, featured in rows.iterator(chunk_size=5000):
+        count = sold.get(book_id, 0)
+        # پرفروش‌ترها اول؛ در تساوی کتاب‌های popular جلوتر می‌آیند
+        ranked.append(((-count, featured != 'popular'), (BOOK, book_id, title, author_name)))
+        name, total = authors.get(author_id, (author_name, 0))
+        authors[author_id] = (name, total + count)
+    ranked.extend(((-count, True), (AUTHOR, author_id, name, None))
+                  for author_id, (name, count) in authors.items())
+    ranked.sort(key=lambda item: item[0])
+    return [entry for _, entry in ranked]
+
+
+_index = None
+_index_version = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return the process-wide index, rebuilding it when the catalog version has
+    moved on. The version is checked at most every CHECK_INTERVAL seconds.
+    While one thread rebuilds, the others keep answering from the previous
+    index.
+    """
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < CHECK_INTERVAL:
+        return _index
+    version = tuple(get_versions(*DEPENDS_ON))
+    if version == _index_version:
+        _checked_at = now
+        return _index
+    if not _lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if version != _index_version:
+            _index = PrefixIndex(_load_entries())
+            _index_version = version
+            _checked_at = now
+    finally:
+        _lock.release()
+    return _index
+
+
+def suggest(text, limit=8):
+    return [
+        {'type': kind, 'id': pk, 'label': label, 'author': extra} if kind == BOOK
+        else {'type': kind, 'id': pk, 'label': label}
+        for kind, pk, label, extra in get_index().lookup(text, min(limit, MAX_RESULTS))
+    ]
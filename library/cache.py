@@ -0,0 +1,116 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from accounts.models import CacheVersion
+from .carts import cart_count
+
+CATALOG = 'catalog'
+SECTION_KEY = 'catalog:section:%s:%s'
+SECTION_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'catalog:version:%s'
+# اگر خواندن هم‌زمان با bump نسخه‌ی قدیمی را در کش بگذارد، حداکثر این مدت کهنه می‌ماند
+VERSION_TIMEOUT = 60
+
+_MISSING = object()
+_table = CacheVersion._meta.db_table
+# افزایش اتمیک در خود دیتابیس؛ دو bump هم‌زمان (حتی از دو process) هیچ‌کدام گم نمی‌شوند
+_BUMP = (
+    f'INSERT INTO {_table} (label, version, modified) VALUES (%s, %s, %s) '
+    f'ON CONFLICT (label) DO UPDATE SET version = {_table}.version + 1, modified = excluded.modified'
+)
+
+
+def _seed():
+    # نسخه‌ی اولیه بر اساس زمان است تا با دیتابیس تازه، کلیدهای کش قدیمی دوباره استفاده نشوند
+    return int(time.time() * 1000)
+
+
+def _rows(labels):
+    rows = {row.label: row for row in CacheVersion.objects.filter(label__in=labels)}
+    missing = [label for label in labels if label not in rows]
+    if missing:
+        now = timezone.now()
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(label=label, version=_seed(), modified=now) for label in missing],
+            ignore_conflicts=True,
+        )
+        rows.update((row.label, row) for row in CacheVersion.objects.filter(label__in=missing))
+    return rows
+
+
+def get_versions(*labels):
+    # منبع اصلی دیتابیس است؛ کش مشترک فقط جلوی یک کوئری برای هر بخش صفحه را می‌گیرد
+    keys = {label: VERSION_KEY % label for label in labels}
+    cached = cache.get_many(keys.values())
+    missing = [label for label in labels if keys[label] not in cached]
+    if missing:
+        rows = _rows(missing)
+        fetched = {keys[label]: rows[label].version for label in missing}
+        cache.set_many(fetched, VERSION_TIMEOUT)
+        cached.update(fetched)
+    return [cached[keys[label]] for label in labels]
+
+
+def bump_version(label):
+    """
+    Invalidate everything cached for ``label``. Must also be called after
+    writes that send no signals (queryset.update, bulk_create, raw SQL).
+    """
+    # هر تغییری در کاتالوگ نسخه‌ی کلی (برای ETag) و زمان آخرین تغییر را هم به‌روز می‌کند
+    labels = [label] if label == CATALOG else [label, CATALOG]
+    now = CacheVersion._meta.get_field('modified').get_db_prep_value(timezone.now(), connection)
+    with connection.cursor() as cursor:
+        cursor.executemany(_BUMP, [(name, _seed(), now) for name in labels])
+    # پاک کردن کش بعد از commit تا کسی پیش از آن نسخه‌ی قدیمی را دوباره در کش نگذارد
+    keys = [VERSION_KEY % name for name in labels]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def catalog_state():
+    # نسخه‌ی کلی و زمان آخرین تغییر با یک کوئری
+    row = _rows([CATALOG])[CATALOG]
+    return row.version, row.modified.replace(microsecond=0)
+
+
+def _request_catalog_state(request):
+    if not hasattr(request, '_catalog_state'):
+        request._catalog_state = catalog_state()
+    return request._catalog_state
+
+
+def catalog_etag(request, *args, **kwargs):
+    # فقط پاسخ کاربران ناشناس یکسان است؛ برای کاربر واردشده صفحه همیشه کامل ساخته می‌شود
+    if request.user.is_authenticated:
+        return None
+    etag = f'catalog-{_request_catalog_state(request)[0]}'
+    # نشان سبد مهمان در صفحه است، پس تعداد اقلامش هم جزو ETag است
+    count = cart_count(request)
+    return f'{etag}-cart{count}' if count else etag
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    # با سبد غیرخالی فقط ETag معتبر است؛ تاریخ تغییر کاتالوگ تغییر سبد را نشان نمی‌دهد
+    if request.user.is_authenticated or cart_count(request):
+        return None
+    return _request_catalog_state(request)[1]
+
+
+catalog_condition = condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+
+
+def cached_section(name, depends_on, build, timeout=SECTION_TIMEOUT):
+    """
+    Return the cached value of a page section, rebuilding it only when one of
+    the models in ``depends_on`` has changed since it was cached.
+    """
+    versions = get_versions(*depends_on)
+    key = SECTION_KEY % (name, '.'.join(str(v) for v in versions))
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,59 @@
+from accounts.models import Book, BookCard
+
+CARD_FIELDS = [
+    'title', 'author', 'author_name', 'genre', 'genre_name', 'publisher', 'publisher_name',
+    'year_published', 'status', 'featured', 'price', 'discounted_price', 'effective_price',
+    'discount_percent', 'image_url', 'image_hash', 'description',
+]
+
+
+def build_card(book):
+    return BookCard(
+        book_id=book.pk,
+        title=book.title,
+        author_id=book.author_id,
+        author_name=book.author.name,
+        genre_id=book.genre_id,
+        genre_name=book.genre.name,
+        publisher_id=book.publisher_id,
+        publisher_name=book.publisher.name,
+        year_published=book.year_published,
+        status=book.status,
+        featured=book.featured,
+        price=book.price,
+        discounted_price=book.discounted_price,
+        effective_price=book.effective_price,
+        discount_percent=book.discount_percent,
+        image_url=book.image.url if book.image else '',
+        image_hash=book.image_hash,
+        description=book.description,
+    )
+
+
+def save_cards(cards):
+    BookCard.objects.bulk_create(
+        cards, update_conflicts=True, unique_fields=['book'], update_fields=CARD_FIELDS,
+    )
+
+
+def refresh_cards(book_ids):
+    books = Book.objects.filter(pk__in=book_ids).select_related('author', 'genre', 'publisher')
+    save_cards([build_card(book) for book in books])
+
+
+def rebuild_cards(batch_size=2000):
+    books = Book.objects.select_related('author', 'genre', 'publisher').order_by('pk')
+    total = 0
+    batch = []
+    for book in books.iterator(chunk_size=batch_size):
+        batch.append(build_card(book))
+        if len(batch) >= batch_size:
+            save_cards(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        save_cards(batch)
+        total += len(batch)
+    # کارت کتاب‌هایی که دیگر وجود ندارند (مثلاً حذف با queryset.update یا SQL مستقیم)
+    BookCard.objects.exclude(book__in=Book.objects.values('pk')).delete()
+    return total
@@ -0,0 +1,374 @@
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import (Case, Count, DecimalField, F, PositiveIntegerField, Subquery, Sum, Value,
+                              When, Window)
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from accounts.models import Book, Cart, CartItem, Delivery
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+MAX_OPERATIONS = 100
+MAX_QUANTITY = 1000
+
+COOKIE_NAME = 'cart'
+COOKIE_SALT = 'library.carts'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+# سقف اقلام سبد مهمان تا کوکی از چهار کیلوبایت بزرگ‌تر نشود
+MAX_SESSION_ITEMS = 50
+
+COUNT_KEY = 'cart:count:%s'
+STAMP_KEY = 'cart:stamp:%s'
+COUNT_TIMEOUT = 60 * 60 * 24
+
+
+class CartOperationError(ValueError):
+    pass
+
+
+class CartSummary:
+    def __init__(self, items, subtotal=ZERO, count=0, quantity=0, delivery_cost=None):
+        self.items = items
+        self.subtotal = subtotal
+        self.count = count
+        self.quantity = quantity
+        # None یعنی روش ارسالی انتخاب نشده یا معتبر نیست
+        self.delivery_cost = delivery_cost
+
+    @property
+    def total(self):
+        return self.subtotal + (self.delivery_cost or ZERO)
+
+    def as_dict(self):
+        return {
+            'subtotal': str(self.subtotal),
+            'count': self.count,
+            'quantity': self.quantity,
+            'delivery_cost': str(self.delivery_cost or ZERO),
+            'total': str(self.total),
+        }
+
+
+class SessionCart:
+    """
+    Cart of an anonymous visitor: book id -> quantity, kept in a signed
+    cookie as "12:1,40:3". Nothing is written to the database; the ids of
+    its items are book ids. SessionCartMiddleware writes the cookie back.
+    """
+
+    pk = None
+
+    def __init__(self, items=None):
+        self.items = dict(items or {})
+        self.modified = False
+
+    @classmethod
+    def from_request(cls, request):
+        cart = getattr(request, '_session_cart', None)
+        if cart is None:
+            value = request.get_signed_cookie(COOKIE_NAME, default=None, salt=COOKIE_SALT)
+            cart = request._session_cart = cls(_decode(value))
+        return cart
+
+    def add(self, book_id):
+        book_id = int(book_id)
+        if book_id not in self.items:
+            if len(self.items) >= MAX_SESSION_ITEMS:
+                raise CartOperationError(f'at most {MAX_SESSION_ITEMS} books in a guest cart')
+            if not Book.objects.filter(pk=book_id).exists():
+                return None
+        self.items[book_id] = min(self.items.get(book_id, 0) + 1, MAX_QUANTITY)
+        self.modified = True
+        return self.items[book_id], len(self.items)
+
+    def clear(self):
+        self.items = {}
+        self.modified = True
+
+    def save(self, response):
+        if not self.modified:
+            return
+        if self.items:
+            response.set_signed_cookie(
+                COOKIE_NAME, _encode(self.items), salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite='Lax')
+
+
+def _encode(items):
+    return ','.join(f'{book_id}:{quantity}' for book_id, quantity in items.items())
+
+
+def _decode(value):
+    items = {}
+    for pair in (value or '').split(','):
+        book_id, _, quantity = pair.partition(':')
+        if book_id.isdigit() and quantity.isdigit() and int(quantity):
+            items[int(book_id)] = min(int(quantity), MAX_QUANTITY)
+        if len(items) >= MAX_SESSION_ITEMS:
+            break
+    return items
+
+
+def user_cart(user):
+    # فقط آخرین سبد کاربر استفاده می‌شود
+    cart = Cart.objects.filter(user=user).order_by('-created_at').first()
+    if not cart:
+        cart = Cart.objects.create(user=user)
+    return cart
+
+
+def cart_count(request):
+    """
+    Number of lines in the visitor's cart for the header badge. Guests count
+    their cookie; users read a cached count that is only trusted while the
+    cart's stamp is unchanged, so it costs a query only after a mutation.
+    """
+    if not request.user.is_authenticated:
+        return len(SessionCart.from_request(request).items)
+    key, stamp_key = COUNT_KEY % request.user.pk, STAMP_KEY % request.user.pk
+    found = cache.get_many([key, stamp_key])
+    stamp = found.get(stamp_key)
+    cached = found.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    latest = Cart.objects.filter(user=request.user).order_by('-created_at').values('pk')[:1]
+    count = CartItem.objects.filter(cart_id=Subquery(latest)).count()
+    # مهری که پیش از شمردن خوانده شد کنار عدد ذخیره می‌شود؛ اگر تغییری وسط شمارش commit شود
+    # مهر عوض شده و این عدد دیگر استفاده نمی‌شود
+    cache.set(key, (stamp, count), COUNT_TIMEOUT)
+    return count
+
+
+def _count_changed(cart):
+    # بعد از commit مهر تازه می‌خورد؛ عدد کش‌شده با مهر قبلی در خواندن بعدی دوباره شمرده می‌شود
+    if isinstance(cart, SessionCart) or not cart.user_id:
+        return
+    stamp_key = STAMP_KEY % cart.user_id
+    transaction.on_commit(lambda: cache.set(stamp_key, uuid.uuid4().hex, COUNT_TIMEOUT))
+
+
+def _delivery_id(value):
+    value = str(value or '')
+    return int(value) if value.isdigit() else None
+
+
+def _delivery_cost(delivery_id):
+    return (Delivery.objects.filter(pk=delivery_id)
+            .annotate(cost=Coalesce('price', Value(ZERO), output_field=_MONEY)).values('cost'))
+
+
+def _session_summary(cart, delivery_id):
+    books = Book.objects.in_bulk(list(cart.items))
+    items = []
+    for book_id, quantity in cart.items.items():
+        book = books.get(book_id)
+        if book is None:  # کتاب از فروشگاه حذف شده
+            continue
+        item = CartItem(id=book_id, product=book, quantity=quantity)
+        item.line_total = ((book.price or ZERO) * quantity).quantize(CENT)
+        items.append(item)
+    cost = _delivery_cost(delivery_id).values_list('cost', flat=True).first() if delivery_id else None
+    return CartSummary(
+        items,
+        sum((item.line_total for item in items), ZERO),
+        len(items),
+        sum(item.quantity for item in items),
+        cost.quantize(CENT) if cost is not None else None,
+    )
+
+
+def cart_summary(cart, delivery_method_id=None):
+    """
+    Items (with their books), subtotal, counts and delivery cost of a cart in
+    one query: the totals are window aggregates over the same rows and the
+    delivery price is a scalar subquery.
+    """
+    delivery_id = _delivery_id(delivery_method_id)
+    if isinstance(cart, SessionCart):
+        return _session_summary(cart, delivery_id)
+    line_total = Coalesce(F('product__price'), Value(ZERO), output_field=_MONEY) * F('quantity')
+    delivery_cost = _delivery_cost(delivery_id)
+    delivery = (Subquery(delivery_cost[:1], output_field=_MONEY)
+                if delivery_id else Value(None, output_field=_MONEY))
+    items = list(
+        CartItem.objects.filter(cart=cart)
+        .select_related('product')
+        .annotate(
+            line_total=line_total,
+            cart_subtotal=Window(Sum(line_total, output_field=_MONEY)),
+            cart_lines=Window(Count('pk')),
+            cart_quantity=Window(Sum('quantity')),
+            delivery_price=delivery,
+        )
+        .order_by('added_at', 'pk')
+    )
+    if not items:
+        cost = delivery_cost.values_list('cost', flat=True).first() if delivery_id else None
+        return CartSummary(items, delivery_cost=cost.quantize(CENT) if cost is not None else None)
+    # SQLite حاصل عبارت‌های اعشاری را بدون گرد کردن برمی‌گرداند
+    for item in items:
+        item.line_total = item.line_total.quantize(CENT)
+    first = items[0]
+    subtotal = (first.cart_subtotal or ZERO).quantize(CENT)
+    delivery = first.delivery_price.quantize(CENT) if first.delivery_price is not None else None
+    return CartSummary(items, subtotal, first.cart_lines, first.cart_quantity, delivery)
+
+
+_ITEMS = CartItem._meta.db_table
+# یک رفت‌وبرگشت: اگر کتاب در سبد باشد تعدادش در خود دیتابیس یکی زیاد می‌شود، وگرنه ردیف ساخته می‌شود.
+# SELECT ... WHERE به‌جای VALUES باعث می‌شود کتاب ناموجود هیچ ردیفی برنگرداند
+_ADD_ITEM = (
+    f'INSERT INTO {_ITEMS} (cart_id, product_id, quantity, added_at, owned) '
+    f'SELECT %s, book_id, 1, %s, %s FROM {Book._meta.db_table} WHERE book_id = %s '
+    f'ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = MIN({_ITEMS}.quantity + 1, {MAX_QUANTITY}) '
+    f'RETURNING quantity'
+)
+
+
+def add_item(cart, book_id):
+    """
+    Add one copy of a book to the cart with a single upsert, so parallel
+    clicks can never lose an update. Returns (new quantity, cart line count),
+    or None when the book does not exist.
+    """
+    if isinstance(cart, SessionCart):
+        return cart.add(book_id)
+    added_at = CartItem._meta.get_field('added_at').get_db_prep_value(timezone.now(), connection)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(_ADD_ITEM, [cart.pk, added_at, False, book_id])
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        if row[0] == 1:  # ردیف تازه درج شد
+            _count_changed(cart)
+        cursor.execute(f'SELECT COUNT(*) FROM {_ITEMS} WHERE cart_id = %s', [cart.pk])
+        return row[0], cursor.fetchone()[0]
+
+
+def _parse_operation(op):
+    if not isinstance(op, dict):
+        raise CartOperationError('each operation must be an object')
+    item_id = op.get('cart_item_id')
+    if not isinstance(item_id, int) or isinstance(item_id, bool):
+        raise CartOperationError('cart_item_id must be an integer')
+    kinds = [key for key in ('delta', 'quantity', 'remove') if key in op]
+    if len(kinds) != 1:
+        raise CartOperationError('exactly one of delta, quantity or remove is required')
+    kind = kinds[0]
+    value = op[kind]
+    if kind == 'remove':
+        if value is not True:
+            raise CartOperationError('remove must be true')
+    elif not isinstance(value, int) or isinstance(value, bool):
+        raise CartOperationError(f'{kind} must be an integer')
+    elif abs(value) > MAX_QUANTITY:
+        raise CartOperationError(f'{kind} must be between -{MAX_QUANTITY} and {MAX_QUANTITY}')
+    elif kind == 'quantity' and value < 0:
+        raise CartOperationError('quantity cannot be negative')
+    return item_id, kind, value
+
+
+def apply_operations(cart, operations):
+    """
+    Apply a batch of {cart_item_id, delta | quantity | remove} operations to
+    the cart in one transaction: operations on the same item are folded
+    together, then one UPDATE and one DELETE are issued.
+
+    Pure deltas are added inside the database (kept between 1 and
+    MAX_QUANTITY), so a batch does not overwrite a concurrent change made by
+    another tab.
+    Returns the ids of the removed items.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise CartOperationError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise CartOperationError(f'at most {MAX_OPERATIONS} operations per batch')
+
+    # item id -> ('delta', جمع تغییرات) یا ('set', تعداد نهایی)
+    changes = {}
+    for item_id, kind, value in map(_parse_operation, operations):
+        previous = changes.get(item_id)
+        if kind == 'remove':
+            changes[item_id] = ('set', 0)
+        elif kind == 'quantity':
+            changes[item_id] = ('set', value)
+        elif previous and previous[0] == 'set':
+            changes[item_id] = ('set', max(1, previous[1] + value) if previous[1] else 0)
+        else:
+            changes[item_id] = ('delta', (previous[1] if previous else 0) + value)
+
+    if isinstance(cart, SessionCart):
+        return _apply_to_session(cart, changes)
+
+    updates = {}
+    removed = []
+    for pk, (kind, value) in changes.items():
+        if kind == 'set' and value == 0:
+            removed.append(pk)
+        elif kind == 'set':
+            updates[pk] = Value(min(value, MAX_QUANTITY))
+        elif value:
+            updates[pk] = Least(Greatest(F('quantity') + value, Value(1)), Value(MAX_QUANTITY))
+
+    items = CartItem.objects.filter(cart=cart)
+    with transaction.atomic():
+        if removed:
+            removed = list(items.filter(pk__in=removed).values_list('pk', flat=True))
+            if items.filter(pk__in=removed).delete()[0]:
+                _count_changed(cart)
+        if updates:
+            items.filter(pk__in=updates).update(
+                quantity=Case(*[When(pk=pk, then=expr) for pk, expr in updates.items()],
+                              default=F('quantity'), output_field=PositiveIntegerField()))
+    return removed
+
+
+def _apply_to_session(cart, changes):
+    removed = []
+    for book_id, (kind, value) in changes.items():
+        if book_id not in cart.items:
+            continue
+        if kind == 'set' and value == 0:
+            del cart.items[book_id]
+            removed.append(book_id)
+        elif kind == 'set':
+            cart.items[book_id] = min(value, MAX_QUANTITY)
+        else:
+            cart.items[book_id] = max(1, min(cart.items[book_id] + value, MAX_QUANTITY))
+    cart.modified = True
+    return removed
+
+
+def merge_session_cart(session_cart, cart):
+    """
+    Move a guest cart into a user's cart with one upsert: quantities of books
+    already in the cart are added together, books that no longer exist are
+    skipped. The guest cart is emptied.
+    """
+    items = session_cart.items
+    if not items:
+        return
+    quantity = ' '.join('WHEN %s THEN %s' for _ in items)
+    placeholders = ', '.join(['%s'] * len(items))
+    sql = (
+        f'INSERT INTO {_ITEMS} (cart_id, product_id, quantity, added_at, owned) '
+        f'SELECT %s, book_id, CASE book_id {quantity} END, %s, %s '
+        f'FROM {Book._meta.db_table} WHERE book_id IN ({placeholders}) '
+        f'ON CONFLICT (cart_id, product_id) DO UPDATE SET '
+        f'quantity = MIN({_ITEMS}.quantity + excluded.quantity, {MAX_QUANTITY})'
+    )
+    added_at = CartItem._meta.get_field('added_at').get_db_prep_value(timezone.now(), connection)
+    params = [cart.pk, *(value for pair in items.items() for value in pair), added_at, False, *items]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    _count_changed(cart)
+    session_cart.clear()
@@ -0,0 +1,102 @@
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast
+
+from accounts.models import Book
+from .cache import cached_section
+
+# (نام فیلتر، فیلد کتاب، فیلد عنوان)
+FACETS = (
+    ('genre', 'genre_id', 'genre__name'),
+    ('author', 'author_id', 'author__name'),
+    ('year', 'year_published', 'year_published'),
+    ('status', 'status', 'status'),
+    ('popular', 'featured', 'featured'),
+)
+NUMERIC_FACETS = ('genre', 'author', 'year')
+CHOICES = {
+    'status': [value for value, _ in Book.STATUS],
+    'popular': [value for value, _ in Book.STATUSS],
+}
+AUTHOR_FACET_LIMIT = 30
+# فیلترهای قیمت روی ستون‌های ذخیره‌شده‌ی کتاب/کارت اعمال می‌شوند و شمارش همه‌ی بخش‌ها را محدود می‌کنند
+PRICE_FILTERS = (
+    ('min_price', 'effective_price__gte'),
+    ('max_price', 'effective_price__lte'),
+)
+
+
+def normalize_filters(params):
+    filters = {}
+    for name, _, _ in FACETS:
+        value = (params.get(name) or '').strip()
+        if not value:
+            continue
+        if name in NUMERIC_FACETS and not value.isdigit():
+            continue
+        if name in CHOICES and value not in CHOICES[name]:
+            continue
+        filters[name] = value
+    if params.get('on_sale') == '1':
+        filters['on_sale'] = '1'
+    for name, _ in PRICE_FILTERS:
+        value = (params.get(name) or '').strip()
+        try:
+            if value and Decimal(value).is_finite() and Decimal(value) >= 0:
+                filters[name] = value
+        except InvalidOperation:
+            continue
+    return filters
+
+
+def filter_books(queryset, filters, exclude=None):
+    for name, field, _ in FACETS:
+        if name != exclude and name in filters:
+            queryset = queryset.filter(**{field: filters[name]})
+    if 'on_sale' in filters:
+        queryset = queryset.filter(discount_percent__gt=0)
+    for name, lookup in PRICE_FILTERS:
+        if name in filters:
+            queryset = queryset.filter(**{lookup: filters[name]})
+    return queryset
+
+
+def _facet_rows(filters):
+    # هر بخش با فیلترهای بقیه‌ی بخش‌ها شمرده می‌شود و همه با UNION ALL در یک کوئری اجرا می‌شوند
+    parts = [
+        filter_books(Book.objects.all(), filters, exclude=name)
+        .order_by()
+        .values(field)
+        .annotate(facet=Value(name), key=Cast(field, CharField()),
+                  label=Cast(F(label), CharField()), count=Count('pk'))
+        .values_list('facet', 'key', 'label', 'count')
+        for name, field, label in FACETS
+    ]
+    return list(parts[0].union(*parts[1:], all=True))
+
+
+def _build_facets(filters):
+    facets = {name: [] for name, _, _ in FACETS}
+    for name, key, label, count in _facet_rows(filters):
+        facets[name].append({'key': key, 'label': label, 'count': count})
+
+    facets['genre'].sort(key=lambda item: item['label'])
+    facets['year'].sort(key=lambda item: int(item['key']), reverse=True)
+    facets['status'].sort(key=lambda item: item['key'])
+    facets['popular'].sort(key=lambda item: item['key'])
+
+    # فقط پرتکرارترین نویسنده‌ها نمایش داده می‌شوند؛ نویسنده‌ی انتخاب‌شده همیشه در لیست می‌ماند
+    authors = sorted(facets['author'], key=lambda item: (-item['count'], item['label']))
+    top = authors[:AUTHOR_FACET_LIMIT]
+    selected = filters.get('author')
+    if selected and all(item['key'] != selected for item in top):
+        top += [item for item in authors if item['key'] == selected]
+    facets['author'] = top
+    return facets
+
+
+def get_facets(filters):
+    key = urlencode(sorted(filters.items()))
+    return cached_section(f'facets:{key}', ('book', 'author', 'genre'), lambda: _build_facets(filters))
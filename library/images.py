@@ -0,0 +1,76 @@
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import content_hash
+
+VARIANT_DIR = 'books/variants'
+VARIANT_WIDTHS = (160, 320, 640)
+VARIANT_FORMATS = {
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+}
+
+
+def variant_name(image_hash, width, ext):
+    return f'{VARIANT_DIR}/{image_hash}-{width}.{ext}'
+
+
+def variant_url(image_hash, width, ext):
+    return default_storage.url(variant_name(image_hash, width, ext))
+
+
+def _read(field_file):
+    field_file.open('rb')
+    try:
+        field_file.seek(0)
+        return field_file.read()
+    finally:
+        field_file.seek(0)
+
+
+def _encode(image, fmt, options):
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        # پس‌زمینه‌ی سفید برای تصاویر شفاف، چون JPEG کانال آلفا ندارد
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(field_file, force=False):
+    """
+    Write resized JPEG and WebP copies of an uploaded book image.
+
+    Variant names are derived from the hash of the original bytes, so an
+    image that was already processed is skipped and identical uploads share
+    the same files. Returns the hash.
+    """
+    data = _read(field_file)
+    image_hash = content_hash(data)
+    pending = [
+        (width, ext) for width in VARIANT_WIDTHS for ext in VARIANT_FORMATS
+        if force or not default_storage.exists(variant_name(image_hash, width, ext))
+    ]
+    if not pending:
+        return image_hash
+
+    with Image.open(BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        source.load()
+        for width, ext in pending:
+            resized = source.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            fmt, options = VARIANT_FORMATS[ext]
+            name = variant_name(image_hash, width, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(_encode(resized, fmt, options)))
+    return image_hash
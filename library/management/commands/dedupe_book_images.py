@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Book
+from library.cache import bump_version
+from library.cards import refresh_cards
+from library.storage import is_hashed_name
+
+
+class Command(BaseCommand):
+    help = 'Rename uploaded book images to content-hash names and remove duplicate copies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        field = Book._meta.get_field('image')
+        storage = field.storage
+        dry_run = options['dry_run']
+        directory = field.upload_to.rstrip('/')
+
+        scanned = unique = rewritten = 0
+        reclaimed = 0
+        targets = set()
+        _, files = storage.listdir(directory)
+        for filename in sorted(files):
+            name = f'{directory}/{filename}'
+            if is_hashed_name(name):
+                targets.add(name)
+                continue
+            scanned += 1
+            size = storage.size(name)
+            with storage.open(name, 'rb') as content:
+                target = storage.hashed_name(name, content)
+                if target not in targets and not storage.exists(target):
+                    unique += 1
+                    reclaimed -= size
+                    if not dry_run:
+                        storage.save(name, content)
+                targets.add(target)
+
+            book_ids = list(Book.objects.filter(image=name).values_list('pk', flat=True))
+            rewritten += len(book_ids)
+            reclaimed += size
+            if dry_run:
+                continue
+            # update مستقیم: فقط مسیر فایل عوض می‌شود و محتوای تصویر (و هش نسخه‌ها) همان است
+            Book.objects.filter(pk__in=book_ids).update(image=target)
+            refresh_cards(book_ids)
+            storage.delete(name)
+
+        if rewritten and not dry_run:
+            bump_version('book')
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{scanned} files scanned, {unique} unique, '
+            f'{rewritten} book references rewritten, {reclaimed} bytes reclaimed.'
+        ))
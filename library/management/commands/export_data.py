@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.exports import DATASETS, FORMATS, ExportError, export_queryset, parse_date, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream books, orders or order items to a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='Output file (default: stdout)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--since', help='Only orders created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Only orders created on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--status', action='append', help='Only rows with this status (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            queryset = export_queryset(
+                options['dataset'],
+                since=parse_date(options['since']),
+                until=parse_date(options['until'], end=True),
+                statuses=options['status'],
+            )
+        except ExportError as e:
+            raise CommandError(e)
+
+        chunks = stream_export(queryset, options['format'], options['gzip'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Book
+from library.cache import bump_version
+from library.cards import refresh_cards
+from library.images import generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and WebP variants for existing book images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image', 'image_hash')
+        done = failed = 0
+        for book in books.iterator(chunk_size=500):
+            try:
+                image_hash = generate_variants(book.image, force=options['force'])
+            except (OSError, ValueError) as e:
+                failed += 1
+                self.stderr.write(f'{book.image.name}: {e}')
+                continue
+            finally:
+                book.image.close()
+            if image_hash != book.image_hash:
+                # update مستقیم تا سیگنال‌های save دوباره اجرا نشوند
+                Book.objects.filter(pk=book.pk).update(image_hash=image_hash)
+                refresh_cards([book.pk])
+            done += 1
+        bump_version('book')
+        self.stdout.write(self.style.SUCCESS(f'{done} images processed, {failed} failed.'))
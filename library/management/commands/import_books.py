@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import Author, Book, Genre, Publisher
+from library import search
+from library.cache import bump_version
+from library.cards import build_card, refresh_cards, save_cards
+
+STATUSES = {value for value, _ in Book.STATUS}
+FEATURED = {value for value, _ in Book.STATUSS}
+PRICE_FIELD = Book._meta.get_field('price')
+YEAR_FIELD = Book._meta.get_field('year_published')
+UPDATE_FIELDS = ['publisher', 'genre', 'year_published', 'status', 'price',
+                 'discounted_price', 'effective_price', 'discount_percent', 'description', 'featured']
+
+
+class RowError(ValueError):
+    pass
+
+
+def _decimal(value):
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f'invalid number {value!r}')
+    # NaN، بی‌نهایت و عددهای بزرگ‌تر از ستون باید همین‌جا رد شوند، نه در bulk_create کل دسته
+    if not number.is_finite() or number < 0:
+        raise RowError(f'invalid number {value!r}')
+    try:
+        number = number.quantize(Decimal(1).scaleb(-PRICE_FIELD.decimal_places))
+        PRICE_FIELD.run_validators(number)
+    except (InvalidOperation, ValidationError):
+        raise RowError(f'number out of range {value!r}')
+    return number
+
+
+def _clean(row):
+    title = (row.get('title') or '').strip()
+    author = (row.get('author') or '').strip()
+    if not title or not author:
+        raise RowError('title and author are required')
+    year = row.get('year_published', row.get('year'))
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        raise RowError(f'invalid year {year!r}')
+    low, high = connection.ops.integer_field_range(YEAR_FIELD.get_internal_type())
+    if (low is not None and year < low) or (high is not None and year > high):
+        raise RowError(f'year out of range {year!r}')
+    status = (row.get('status') or 'exist').strip()
+    featured = (row.get('featured') or 'normal').strip()
+    if status not in STATUSES or featured not in FEATURED:
+        raise RowError(f'invalid status/featured {status!r}/{featured!r}')
+    return {
+        'title': title[:255],
+        'author': author[:255],
+        'publisher': (row.get('publisher') or '').strip()[:255] or 'Unknown',
+        'genre': (row.get('genre') or '').strip()[:100] or 'Unknown',
+        'year_published': year,
+        'status': status,
+        'featured': featured,
+        'price': _decimal(row.get('price')),
+        'discounted_price': _decimal(row.get('discounted_price')),
+        'description': (row.get('description') or '')[:500] or None,
+    }
+
+
+def _json_row(line):
+    line = line.strip()
+    if not line:
+        return {}
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise RowError(f'invalid JSON: {e}')
+    if not isinstance(row, dict):
+        raise RowError('expected a JSON object')
+    return row
+
+
+def _read_rows(path, fmt):
+    # خط‌های JSONL خام برگردانده می‌شوند تا خطای هر خط مثل بقیه‌ی ردیف‌ها گزارش و رد شود
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            yield from f
+
+
+class NameCache:
+    """
+    name -> instance cache for a lookup model; missing names of a batch are
+    fetched with one query and the rest created with one bulk_create.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.objects = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self.objects}
+        if not missing:
+            return
+        # اگر چند ردیف هم‌نام وجود داشته باشد، قدیمی‌ترین انتخاب می‌شود
+        for pk, name in (self.model.objects.filter(name__in=missing)
+                         .order_by('-pk').values_list('pk', 'name')):
+            self.objects[name] = self.model(pk=pk, name=name)
+        created = self.model.objects.bulk_create(
+            [self.model(name=name) for name in missing if name not in self.objects])
+        for obj in created:
+            self.objects[obj.name] = obj
+
+    def __getitem__(self, name):
+        return self.objects[name]
+
+
+class Command(BaseCommand):
+    help = 'Stream books from a CSV or JSONL file into the catalog in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='File format (guessed from the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update books that already exist with the same title and author')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        batch_size = options['batch_size']
+
+        done = 0
+        if not options['restart'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                done = json.load(f)['rows']
+            self.stdout.write(f'Resuming after row {done}.')
+
+        self.authors = NameCache(Author)
+        self.publishers = NameCache(Publisher)
+        self.genres = NameCache(Genre)
+        self.upsert = options['upsert']
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0}
+
+        started = time.monotonic()
+        batch = []
+        row_number = 0
+        for row_number, row in enumerate(_read_rows(path, fmt), start=1):
+            if row_number <= done:
+                continue
+            try:
+                if fmt == 'jsonl':
+                    row = _json_row(row)
+                batch.append((row_number, _clean(row)))
+            except (RowError, AttributeError) as e:
+                self.stats['skipped'] += 1
+                self.stderr.write(f'row {row_number}: {e}')
+            if len(batch) >= batch_size:
+                self._flush(batch)
+                batch = []
+                self._checkpoint(checkpoint, row_number, started, done)
+        if batch:
+            self._flush(batch)
+        self._checkpoint(checkpoint, row_number, started, done)
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        bump_version('book')
+        bump_version('author')
+        bump_version('genre')
+        bump_version('publisher')
+        self.stdout.write(self.style.SUCCESS(
+            'Import finished: {created} created, {updated} updated, {skipped} skipped.'.format(**self.stats)
+        ))
+
+    def _checkpoint(self, checkpoint, row_number, started, resumed_from):
+        with open(checkpoint, 'w') as f:
+            json.dump({'rows': row_number}, f)
+        elapsed = time.monotonic() - started
+        rate = (row_number - resumed_from) / elapsed if elapsed else 0
+        self.stdout.write(f'{row_number} rows ({rate:.0f} rows/s)')
+
+    @transaction.atomic
+    def _flush(self, rows):
+        self.authors.resolve({row['author'] for _, row in rows})
+        self.publishers.resolve({row['publisher'] for _, row in rows})
+        self.genres.resolve({row['genre'] for _, row in rows})
+
+        # ردیف تکراری در یک دسته: با --upsert آخرین مقدار برنده است، وگرنه گزارش و رد می‌شود
+        books = {}
+        row_numbers = {}
+        for row_number, row in rows:
+            book = Book(
+                title=row['title'],
+                author=self.authors[row['author']],
+                publisher=self.publishers[row['publisher']],
+                genre=self.genres[row['genre']],
+                year_published=row['year_published'],
+                status=row['status'],
+                featured=row['featured'],
+                price=row['price'],
+                discounted_price=row['discounted_price'],
+                description=row['description'],
+            )
+            book.update_price_fields()
+            key = (book.title, book.author_id)
+            if key in books and not self.upsert:
+                self.stats['skipped'] += 1
+                self.stderr.write(f'row {row_number}: duplicate of row {row_numbers[key]} '
+                                  f'(same title and author)')
+                continue
+            books[key] = book
+            row_numbers[key] = row_number
+
+        existing = {}
+        if self.upsert:
+            for pk, title, author_id in Book.objects.filter(
+                    author_id__in={key[1] for key in books},
+                    title__in={key[0] for key in books}).values_list('pk', 'title', 'author_id'):
+                existing[(title, author_id)] = pk
+
+        to_update = []
+        for key, book in books.items():
+            if key in existing:
+                book.pk = existing[key]
+                to_update.append(book)
+        to_create = [book for key, book in books.items() if key not in existing]
+
+        created = Book.objects.bulk_create(to_create)
+        Book.objects.bulk_update(to_update, UPDATE_FIELDS)
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(to_update)
+
+        # bulk_create سیگنال ندارد؛ کارت‌ها و ایندکس جستجو همین‌جا به‌روز می‌شوند.
+        # کتاب‌های به‌روزشده ممکن است تصویر داشته باشند، پس کارتشان از دیتابیس ساخته می‌شود
+        save_cards([build_card(book) for book in created])
+        refresh_cards([book.pk for book in to_update])
+        search.index_books(created + to_update)
@@ -0,0 +1,124 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts.models import Cart, CartItem
+
+DB_SESSIONS = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned guest carts and expired sessions in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Guest carts older than this many days are deleted')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Primary-key range (carts) or rows (sessions) per transaction')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between batches so other writers get the lock')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Return free pages to the OS with PRAGMA incremental_vacuum')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.pause = options['pause']
+        self.dry_run = options['dry_run']
+        before = self.pages()
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        carts, items = self.purge_carts(cutoff)
+        sessions = self.purge_sessions()
+
+        prefix = '[dry run] ' if self.dry_run else ''
+        self.stdout.write(f'{prefix}{carts} carts, {items} cart items, {sessions} sessions deleted.')
+        if options['vacuum'] and not self.dry_run:
+            self.vacuum()
+
+        after = self.pages()
+        if before and after:
+            self.stdout.write(self.style.SUCCESS(
+                f'{prefix}pages: {before[0]} -> {after[0]} in file, '
+                f'{before[1]} -> {after[1]} free ({after[2]} bytes each).'
+            ))
+
+    def purge_carts(self, cutoff):
+        # سبدهای مهمان دیگر در کوکی‌اند؛ ردیف‌های بدون کاربر باقی‌مانده‌ی نسخه‌ی قبلی یا رها شده‌اند
+        stale = Cart.objects.filter(user__isnull=True, created_at__lt=cutoff)
+        bounds = stale.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return 0, 0
+
+        carts = items = 0
+        for start in range(bounds['low'], bounds['high'] + 1, self.batch_size):
+            # هر بازه‌ی کلید یک تراکنش کوتاه است تا قفل نوشتن SQLite زیاد نگه داشته نشود
+            batch = stale.filter(pk__gte=start, pk__lt=start + self.batch_size)
+            with transaction.atomic():
+                ids = list(batch.values_list('pk', flat=True))
+                if not ids:
+                    continue
+                if self.dry_run:
+                    carts += len(ids)
+                    items += CartItem.objects.filter(cart_id__in=ids).count()
+                    continue
+                _, deleted = Cart.objects.filter(pk__in=ids).delete()
+            carts += deleted.get(Cart._meta.label, 0)
+            items += deleted.get(CartItem._meta.label, 0)
+            self.sleep()
+        return carts, items
+
+    def purge_sessions(self):
+        if settings.SESSION_ENGINE not in DB_SESSIONS:
+            return 0
+        expired = Session.objects.filter(expire_date__lt=timezone.now()).order_by('session_key')
+        deleted = 0
+        last = ''
+        while True:
+            with transaction.atomic():
+                keys = list(expired.filter(session_key__gt=last).values_list('session_key', flat=True)
+                            [:self.batch_size])
+                if not keys:
+                    break
+                if not self.dry_run:
+                    Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            last = keys[-1]
+            self.sleep()
+        return deleted
+
+    def sleep(self):
+        if self.pause and not self.dry_run:
+            time.sleep(self.pause)
+
+    def pages(self):
+        if connection.vendor != 'sqlite':
+            return None
+        with connection.cursor() as cursor:
+            values = []
+            for pragma in ('page_count', 'freelist_count', 'page_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                values.append(cursor.fetchone()[0])
+        return values
+
+    def vacuum(self):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA auto_vacuum')
+            mode = cursor.fetchone()[0]
+            if mode != 2:
+                # VACUUM کامل کل پایگاه داده را قفل می‌کند؛ این دستور آن را اجرا نمی‌کند
+                self.stdout.write(self.style.WARNING(
+                    'auto_vacuum is not INCREMENTAL; run "PRAGMA auto_vacuum = INCREMENTAL; VACUUM;" '
+                    'once during maintenance to enable --vacuum.'
+                ))
+                return
+        # execute() فقط یک قدم از pragma را اجرا می‌کند (یک صفحه)؛ executescript آن را تا آخر می‌برد
+        connection.connection.executescript('PRAGMA incremental_vacuum;')
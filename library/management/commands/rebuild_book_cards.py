@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from library.cache import bump_version
+from library.cards import rebuild_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized book card table used by listing pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_cards(batch_size=options['batch_size'])
+        # bulk_create کارت‌ها سیگنالی نمی‌فرستد
+        bump_version('book')
+        self.stdout.write(self.style.SUCCESS(f'{total} book cards written.'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute "customers also bought" neighbours from completed orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = recommendations.rebuild(options['top_k'])
+        engine = 'numpy/scipy' if recommendations.np is not None else 'pure Python'
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} neighbours in {time.monotonic() - started:.1f}s ({engine}).'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library import sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-book daily sales rollup from completed orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        total = sales.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} daily sales rows written.'))
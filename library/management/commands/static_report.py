@@ -0,0 +1,42 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Report per-asset size savings of the precompressed static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=30, help='Number of largest assets to list')
+
+    def handle(self, *args, **options):
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+        if not hashed_files:
+            raise CommandError('No staticfiles manifest found; run collectstatic with DEBUG = False first.')
+
+        rows = []
+        for hashed_name in set(hashed_files.values()):
+            path = os.path.join(settings.STATIC_ROOT, hashed_name)
+            if not os.path.isfile(path):
+                continue
+            size = os.path.getsize(path)
+            gz = os.path.getsize(path + '.gz') if os.path.isfile(path + '.gz') else None
+            br = os.path.getsize(path + '.br') if os.path.isfile(path + '.br') else None
+            rows.append((hashed_name, size, gz, br))
+
+        rows.sort(key=lambda row: row[1], reverse=True)
+        total = sum(row[1] for row in rows)
+        served = sum(min(x for x in row[1:] if x is not None) for row in rows)
+
+        self.stdout.write(f'{"asset":<60} {"original":>10} {"gzip":>10} {"brotli":>10} {"saved":>7}')
+        for name, size, gz, br in rows[:options['limit']]:
+            best = min(x for x in (size, gz, br) if x is not None)
+            saved = 100 - best * 100 // size if size else 0
+            self.stdout.write(f'{name[-60:]:<60} {size:>10} {gz or "-":>10} {br or "-":>10} {saved:>6}%')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(rows)} assets, {total} bytes original, {served} bytes served compressed '
+            f'({total - served} bytes saved).'
+        ))
@@ -1,3 +1,15 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+
+from .carts import SessionCart
+from .storage import STATIC_HASHED_NAME
+
+
 class RateLimitMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -14,4 +26,88 @@ class RateLimitMiddleware:
         else:
             self.requests[ip] = [now]
 
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: q}; ``gzip;q=0`` means refused."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serve collected static files from STATIC_ROOT, preferring the ``.br`` or
+    ``.gz`` sibling the client accepts. Hashed names get a one-year
+    immutable Cache-Control header.
+    """
+
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        # در حالت DEBUG فایل‌های منبع مستقیم سرو می‌شوند، نه نسخه‌ی قدیمی collectstatic
+        if settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = settings.STATIC_ROOT
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and self.root and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, path):
+        try:
+            full_path = safe_join(self.root, path)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, target = None, full_path
+        for name, ext in self.encodings:
+            if accepted.get(name, accepted.get('*', 0)) > 0 and os.path.isfile(full_path + ext):
+                encoding, target = name, full_path + ext
+                break
+
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = FileResponse(open(target, 'rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        if STATIC_HASHED_NAME.search(path):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=300'
+        return response
+
+
+class SessionCartMiddleware:
+    """Write the guest cart cookie back when a view has changed the cart."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        cart = getattr(request, '_session_cart', None)
+        if isinstance(cart, SessionCart):
+            cart.save(response)
+        return response
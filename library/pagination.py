@@ -0,0 +1,123 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values, direction):
+    # Decimal (مثل effective_price) در JSON نیست؛ رشته می‌شود و هنگام خواندن با فیلد مرتب‌سازی برمی‌گردد
+    values = [str(value) if isinstance(value, Decimal) else value for value in values]
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        return None
+    return direction, values
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over a stable, unique ordering.
+
+    Each page is read with ``WHERE (key) < (last key) ... LIMIT per_page + 1``
+    instead of an OFFSET, so a deep page costs the same as the first one and
+    no COUNT(*) is needed to know whether another page exists.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-year_published', '-book_id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.model_fields = [queryset.model._meta.get_field(name) for name in self.fields]
+
+    def _seek(self, values, reverse):
+        # (a, b) > (va, vb)  =>  a > va OR (a = va AND b > vb)
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            name = self.fields[index]
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(self.fields[:index], values[:index]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    def _values(self, values):
+        # cursor از کاربر می‌آید؛ مقدار ناهم‌خوان با فیلدهای مرتب‌سازی یعنی برگشت به صفحه‌ی اول
+        if len(values) != len(self.fields):
+            return None
+        parsed = []
+        for field, value in zip(self.model_fields, values):
+            if value is None or isinstance(value, (bool, list, dict)):
+                return None
+            try:
+                parsed.append(field.to_python(value))
+            except ValidationError:
+                return None
+        return parsed
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def get_page(self, cursor=None, with_count=False):
+        decoded = decode_cursor(cursor) if cursor else None
+        direction, values = decoded if decoded else ('next', None)
+        if values is not None:
+            values = self._values(values)
+        if values is None:
+            direction = 'next'
+        reverse = direction == 'prev'
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(self._key(rows[-1]), 'next')
+            if values is not None and (has_more or not reverse):
+                previous_cursor = encode_cursor(self._key(rows[0]), 'prev')
+
+        count = self.queryset.count() if with_count else None
+        return KeysetPage(rows, next_cursor, previous_cursor, count)
@@ -0,0 +1,34 @@
+import random
+
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.models import qoute
+from .cache import cached_section
+
+
+def quote_ids():
+    return cached_section('quote_ids', ('qoute',),
+                          lambda: list(qoute.objects.order_by('pk').values_list('pk', flat=True)))
+
+
+def pick_quote(daily=None):
+    """
+    Pick a quote from the cached id list and load only that row.
+
+    In daily mode the choice is seeded with today's date, so every request
+    gets the same quote until the day changes.
+    """
+    if daily is None:
+        daily = getattr(settings, 'QUOTE_OF_THE_DAY', False)
+
+    ids = quote_ids()
+    if not ids:
+        return None
+
+    if daily:
+        pk = random.Random(timezone.localdate().toordinal()).choice(ids)
+    else:
+        pk = random.choice(ids)
+
+    return cached_section(f'quote:{pk}', ('qoute',), lambda: qoute.objects.filter(pk=pk).first())
@@ -0,0 +1,167 @@
+from array import array
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.models import BookCard, BookNeighbour, OrderItem
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # numpy/scipy اختیاری‌اند؛ بدون آن‌ها ماتریس با دیکشنری ساخته می‌شود (کندتر)
+    np = sparse = None
+
+TOP_K = 10
+CACHE_KEY = 'recommendations:%s:%s'
+GENERATION_KEY = 'recommendations:generation'
+CACHE_TIMEOUT = 60 * 60 * 24
+WRITE_BATCH = 5000
+
+
+def _completed_items():
+    return (OrderItem.objects.filter(order__status='completed')
+            .order_by().values_list('order_id', 'product_id'))
+
+
+def _top_k_numpy(orders, books, k):
+    # ماتریس سفارش×کتاب؛ حاصل‌ضرب ترانهاده‌اش در خودش تعداد سفارش‌های مشترک هر دو کتاب است
+    orders = np.frombuffer(orders, dtype=np.int64)
+    books = np.frombuffer(books, dtype=np.int64)
+    order_ids, rows = np.unique(orders, return_inverse=True)
+    book_ids, cols = np.unique(books, return_inverse=True)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                               shape=(len(order_ids), len(book_ids)))
+    matrix.data[:] = 1  # یک کتاب دو بار در یک سفارش فقط یک بار شمرده می‌شود
+    co = (matrix.T @ matrix).tocsr()
+    co.setdiag(0)
+    co.eliminate_zeros()
+    for row in range(co.shape[0]):
+        start, end = co.indptr[row], co.indptr[row + 1]
+        if start == end:
+            continue
+        scores = co.data[start:end]
+        neighbours = co.indices[start:end]
+        if end - start > k:
+            best = np.argpartition(-scores, k)[:k]
+            scores, neighbours = scores[best], neighbours[best]
+        book_id = int(book_ids[row])
+        yield from ((book_id, int(book_ids[n]), int(s)) for n, s in zip(neighbours, scores))
+
+
+def _top_k_python(orders, books, k):
+    baskets = defaultdict(set)
+    for order_id, book_id in zip(orders, books):
+        baskets[order_id].add(book_id)
+    co = defaultdict(Counter)
+    for basket in baskets.values():
+        for book_id in basket:
+            counter = co[book_id]
+            for other in basket:
+                if other != book_id:
+                    counter[other] += 1
+    for book_id, counter in co.items():
+        yield from ((book_id, other, score) for other, score in counter.most_common(k))
+
+
+def rebuild(k=TOP_K):
+    """Recompute the top-k neighbours of every book from the order history."""
+    orders, books = array('q'), array('q')
+    for order_id, book_id in _completed_items().iterator(chunk_size=10000):
+        orders.append(order_id)
+        books.append(book_id)
+    top_k = _top_k_numpy if np is not None else _top_k_python
+
+    written = 0
+    with transaction.atomic():
+        BookNeighbour.objects.all().delete()
+        batch = []
+        for book_id, other, score in top_k(orders, books, k):
+            batch.append(BookNeighbour(book_id=book_id, neighbour_id=other, score=score))
+            if len(batch) >= WRITE_BATCH:
+                BookNeighbour.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        BookNeighbour.objects.bulk_create(batch)
+        written += len(batch)
+    transaction.on_commit(_new_generation)
+    return written
+
+
+def record_order(order_id, k=TOP_K):
+    """
+    Fold one newly completed order into the stored neighbours.
+
+    Only pairs inside this order changed, so their exact counts are fetched
+    and merged into each book's top-k; the rest of the list stays valid.
+    """
+    basket = set(OrderItem.objects.filter(order_id=order_id).values_list('product_id', flat=True))
+    if len(basket) < 2:
+        return
+    with transaction.atomic():
+        for book_id in basket:
+            counts = (
+                OrderItem.objects
+                .filter(order__status='completed', order__items__product_id=book_id,
+                        product_id__in=basket - {book_id})
+                .order_by().values('product_id')
+                .annotate(score=Count('order', distinct=True))
+                .values_list('product_id', 'score')
+            )
+            BookNeighbour.objects.bulk_create(
+                [BookNeighbour(book_id=book_id, neighbour_id=other, score=score) for other, score in counts],
+                update_conflicts=True, unique_fields=['book', 'neighbour'], update_fields=['score'],
+            )
+            keep = (BookNeighbour.objects.filter(book_id=book_id)
+                    .order_by('-score', 'neighbour_id').values_list('pk', flat=True)[:k])
+            BookNeighbour.objects.filter(book_id=book_id).exclude(pk__in=list(keep)).delete()
+    generation = _generation()
+    transaction.on_commit(lambda: cache.delete_many([CACHE_KEY % (generation, pk) for pk in basket]))
+
+
+def _generation():
+    cache.add(GENERATION_KEY, 1, timeout=None)
+    return cache.get(GENERATION_KEY, 1)
+
+
+def _new_generation():
+    cache.add(GENERATION_KEY, 1, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def neighbours(book_ids):
+    """book id -> [(neighbour id, score), ...], read through the cache."""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return {}
+    generation = _generation()
+    keys = {CACHE_KEY % (generation, pk): pk for pk in book_ids}
+    found = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = book_ids - found.keys()
+    if missing:
+        loaded = {pk: [] for pk in missing}
+        for book_id, other, score in (BookNeighbour.objects.filter(book_id__in=missing)
+                                      .order_by('book_id', '-score')
+                                      .values_list('book_id', 'neighbour_id', 'score')):
+            loaded[book_id].append((other, score))
+        cache.set_many({CACHE_KEY % (generation, pk): value for pk, value in loaded.items()},
+                       CACHE_TIMEOUT)
+        found.update(loaded)
+    return found
+
+
+def also_bought(book_ids, limit=4):
+    """Cards of the books most often bought together with ``book_ids``."""
+    book_ids = set(book_ids)
+    scores = Counter()
+    for pairs in neighbours(book_ids).values():
+        for other, score in pairs:
+            if other not in book_ids:
+                scores[other] += score
+    ids = [pk for pk, _ in scores.most_common(limit)]
+    cards = BookCard.objects.in_bulk(ids)
+    return [cards[pk] for pk in ids if pk in cards]
@@ -0,0 +1,95 @@
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from accounts.models import Book, BookSales, Order, OrderItem
+from .cache import bump_version, cached_section
+
+WINDOWS = (7, 30, 365)
+DEFAULT_WINDOW = 30
+
+_table = BookSales._meta.db_table
+# افزایش اتمیک: دو سفارش هم‌زمان برای یک کتاب و یک روز هیچ‌کدام گم نمی‌شوند
+_UPSERT = (
+    f'INSERT INTO {_table} (book_id, day, quantity, revenue) VALUES (%s, %s, %s, %s) '
+    f'ON CONFLICT (book_id, day) DO UPDATE SET '
+    f'quantity = {_table}.quantity + excluded.quantity, '
+    f'revenue = {_table}.revenue + excluded.revenue'
+)
+
+
+def _sale_day(order):
+    moment = order.payment_date or order.created_at or timezone.now()
+    if hasattr(moment, 'togregorian'):
+        moment = moment.togregorian()
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+def record_order(order_id):
+    """Add the items of a newly completed order to the daily rollup."""
+    order = Order.objects.filter(pk=order_id, status='completed').first()
+    if order is None:
+        return
+    day = _sale_day(order)
+    rows = [
+        (product_id, day, quantity, price * quantity)
+        for product_id, quantity, price in OrderItem.objects.filter(order_id=order_id)
+        .values_list('product_id', 'quantity', 'price')
+    ]
+    if not rows:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_UPSERT, rows)
+    transaction.on_commit(lambda: bump_version('sales'))
+
+
+def rebuild(batch_size=5000):
+    """Recompute the whole rollup from the OrderItem history."""
+    rows = (
+        OrderItem.objects.filter(order__status='completed')
+        .annotate(day=TruncDate(Coalesce('order__payment_date', 'order__created_at')))
+        .values('product_id', 'day')
+        .annotate(total=Sum('quantity'),
+                  revenue=Sum(F('price') * F('quantity'), output_field=DecimalField()))
+        .order_by()
+        .values_list('product_id', 'day', 'total', 'revenue')
+    )
+    written = 0
+    with transaction.atomic():
+        BookSales.objects.all().delete()
+        batch = []
+        for product_id, day, total, revenue in rows.iterator(chunk_size=batch_size):
+            batch.append(BookSales(book_id=product_id, day=day, quantity=total, revenue=revenue))
+            if len(batch) >= batch_size:
+                BookSales.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        BookSales.objects.bulk_create(batch)
+        written += len(batch)
+    transaction.on_commit(lambda: bump_version('sales'))
+    return written
+
+
+def best_seller_ids(days=DEFAULT_WINDOW, limit=10):
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    return list(
+        BookSales.objects.filter(day__gte=since)
+        .values('book_id').annotate(total=Sum('quantity'))
+        .order_by('-total', 'book_id')
+        .values_list('book_id', flat=True)[:limit]
+    )
+
+
+def best_sellers(days=DEFAULT_WINDOW, limit=10):
+    """Books sold most in the last ``days`` days, best first (cached)."""
+    def build():
+        ids = best_seller_ids(days, limit)
+        books = Book.objects.select_related('author').in_bulk(ids)
+        return [books[pk] for pk in ids if pk in books]
+
+    # کلید کش روز جاری را هم دارد تا پنجره با گذشت روز جابه‌جا شود
+    return cached_section(f'best_sellers_{days}_{limit}_{timezone.localdate():%Y%m%d}',
+                          ('book', 'author', 'sales'), build)
@@ -0,0 +1,144 @@
+import re
+
+from django.db import connection
+from django.utils.html import strip_tags
+
+from accounts.models import Book, BookCard
+
+SEARCH_TABLE = 'book_search'
+
+# وزن ستون‌ها در bm25: عنوان، نویسنده، ناشر، توضیحات
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_CHAR_MAP = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'أ': 'ا',
+    'إ': 'ا',
+    '\u200c': ' ',  # نیم‌فاصله
+    '\u200d': '',
+    '\u0640': '',  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+})
+
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS.sub('', str(text).translate(_CHAR_MAP))
+    return ' '.join(text.lower().split())
+
+
+def _document(book):
+    return (
+        book.pk,
+        normalize(book.title),
+        normalize(book.author.name),
+        normalize(book.publisher.name),
+        normalize(strip_tags(book.description or '')),
+    )
+
+
+_INSERT = (f'INSERT INTO {SEARCH_TABLE} (rowid, title, author, publisher, description) '
+           f'VALUES (%s, %s, %s, %s, %s)')
+
+
+def index_books(books):
+    rows = [_document(book) for book in books]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(_INSERT, rows)
+
+
+def remove_book(book_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [book_id])
+
+
+def rebuild_index(batch_size=2000):
+    books = Book.objects.select_related('author', 'publisher').order_by('pk')
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for book in books.iterator(chunk_size=batch_size):
+            batch.append(_document(book))
+            if len(batch) >= batch_size:
+                cursor.executemany(_INSERT, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(_INSERT, batch)
+            total += len(batch)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def match_expression(query):
+    # هر کلمه به صورت پیشوندی جستجو می‌شود و همه‌ی کلمات باید وجود داشته باشند
+    tokens = _TOKEN.findall(normalize(query))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class BookSearch:
+    """
+    Ranked full-text results that can be handed straight to ``Paginator``.
+
+    Only the requested page is read from the FTS index; the matching book
+    cards are then loaded by primary key. ``queryset`` restricts the results to the
+    books it contains (e.g. the listing filters).
+    """
+
+    def __init__(self, query, queryset=None):
+        self.expression = match_expression(query)
+        self.queryset = queryset
+        self._count = None
+
+    def _where(self):
+        sql = f'{SEARCH_TABLE} MATCH %s'
+        params = [self.expression]
+        if self.queryset is not None:
+            subquery, subparams = self.queryset.order_by().values('pk').query.sql_with_params()
+            sql += f' AND rowid IN ({subquery})'
+            params.extend(subparams)
+        return sql, params
+
+    def count(self):
+        if self._count is None:
+            if not self.expression:
+                self._count = 0
+            else:
+                where, params = self._where()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {where}', params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not self.expression:
+            return []
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        where, params = self._where()
+        weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {where} '
+                f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s',
+                params + [limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        books = BookCard.objects.in_bulk(ids)
+        return [books[pk] for pk in ids if pk in books]
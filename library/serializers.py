@@ -0,0 +1,56 @@
+from rest_framework import serializers
+
+from accounts.models import Author, Book, Genre, Publisher
+
+
+class SparseFieldsMixin:
+    """
+    Limit the serialized fields to ``?fields=a,b,c`` when the parameter is given.
+    Unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in list(self.fields):
+            if name not in wanted:
+                self.fields.pop(name)
+
+
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['author_id', 'name']
+
+
+class PublisherSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Publisher
+        fields = ['publisher_id', 'name']
+
+
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ['genre_id', 'name']
+
+
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author_name = serializers.CharField(source='author.name', read_only=True)
+    genre_name = serializers.CharField(source='genre.name', read_only=True)
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
+    discount_percentage = serializers.IntegerField(source='discount_percent', read_only=True)
+
+    class Meta:
+        model = Book
+        fields = [
+            'book_id', 'title', 'author', 'author_name', 'genre', 'genre_name',
+            'publisher', 'publisher_name', 'year_published', 'status', 'featured',
+            'price', 'discounted_price', 'discount_percentage', 'description', 'image',
+        ]
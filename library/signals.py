@@ -0,0 +1,114 @@
+import logging
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from accounts.models import Author, Book, BookCard, Genre, Order, Publisher, qoute
+from . import cards, carts, images, recommendations, sales, search
+from .cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+CATALOG_MODELS = (Book, Genre, Author, Publisher, qoute)
+
+
+def bump_catalog_version(sender, **kwargs):
+    # بعد از commit نسخه را بالا می‌بریم تا هیچ درخواستی داده‌ی قدیمی را دوباره کش نکند
+    label = sender._meta.model_name
+    transaction.on_commit(lambda: bump_version(label))
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(bump_catalog_version, sender=model,
+                      dispatch_uid=f'catalog_version_save_{model._meta.model_name}')
+    post_delete.connect(bump_catalog_version, sender=model,
+                        dispatch_uid=f'catalog_version_delete_{model._meta.model_name}')
+
+
+def index_book(sender, instance, **kwargs):
+    search.index_books([instance])
+
+
+def unindex_book(sender, instance, **kwargs):
+    search.remove_book(instance.pk)
+
+
+def reindex_related_books(sender, instance, created, **kwargs):
+    # تغییر نام نویسنده یا ناشر روی همه‌ی کتاب‌هایش در ایندکس جستجو اثر می‌گذارد
+    if created:
+        return
+    field = sender._meta.model_name
+    books = Book.objects.filter(**{field: instance}).select_related('author', 'publisher')
+    search.index_books(books.iterator(chunk_size=2000))
+
+
+post_save.connect(index_book, sender=Book, dispatch_uid='search_index_book')
+post_delete.connect(unindex_book, sender=Book, dispatch_uid='search_unindex_book')
+post_save.connect(reindex_related_books, sender=Author, dispatch_uid='search_reindex_author')
+post_save.connect(reindex_related_books, sender=Publisher, dispatch_uid='search_reindex_publisher')
+
+
+def refresh_book_card(sender, instance, **kwargs):
+    cards.save_cards([cards.build_card(instance)])
+
+
+def rename_book_cards(sender, instance, created, **kwargs):
+    # نام نویسنده/ژانر/ناشر با یک UPDATE روی همه‌ی کارت‌ها اعمال می‌شود
+    if created:
+        return
+    field = sender._meta.model_name
+    BookCard.objects.filter(**{field: instance}).update(**{f'{field}_name': instance.name})
+
+
+post_save.connect(refresh_book_card, sender=Book, dispatch_uid='book_card_refresh')
+for model in (Author, Genre, Publisher):
+    post_save.connect(rename_book_cards, sender=model,
+                      dispatch_uid=f'book_card_rename_{model._meta.model_name}')
+
+
+def process_book_image(sender, instance, **kwargs):
+    # فقط برای فایل تازه آپلودشده (یا کتابی که هنوز هش ندارد) نسخه‌های کوچک ساخته می‌شود
+    if not instance.image:
+        instance.image_hash = ''
+        return
+    if instance.image._committed and instance.image_hash:
+        return
+    try:
+        instance.image_hash = images.generate_variants(instance.image)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not generate variants for {instance.image.name}: {e}")
+
+
+pre_save.connect(process_book_image, sender=Book, dispatch_uid='book_image_variants')
+
+
+def remember_order_status(sender, instance, **kwargs):
+    # از __dict__ خوانده می‌شود تا فیلد defer شده کوئری اضافه نزند
+    instance._saved_status = instance.__dict__.get('status')
+
+
+def order_completed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_saved_status', None)
+    instance._saved_status = instance.status
+    if instance.status != 'completed' or (previous == 'completed' and not created):
+        return
+    order_id = instance.pk
+    transaction.on_commit(lambda: sales.record_order(order_id))
+    transaction.on_commit(lambda: recommendations.record_order(order_id))
+
+
+post_init.connect(remember_order_status, sender=Order, dispatch_uid='order_status_remember')
+post_save.connect(order_completed, sender=Order, dispatch_uid='order_completed')
+
+
+def merge_guest_cart(sender, request, user, **kwargs):
+    # سبد مهمانی که در کوکی بود با یک upsert به سبد کاربر اضافه و کوکی پاک می‌شود
+    if request is None:
+        return
+    guest_cart = carts.SessionCart.from_request(request)
+    if guest_cart.items:
+        carts.merge_session_cart(guest_cart, carts.user_cart(user))
+
+
+user_logged_in.connect(merge_guest_cart, dispatch_uid='merge_guest_cart')
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import os
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.utils.deconstruct import deconstructible
+
+HASH_LENGTH = 40
+# نام فایل‌هایی که از محتوایشان ساخته شده‌اند (اصل تصویر یا نسخه‌های کوچک آن)
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{20,64}(-\d+)?\.[A-Za-z0-9]+$')
+
+
+def content_hash(content, chunk_size=64 * 1024):
+    """
+    Shortened sha256 of bytes or a file, used for both uploaded image names
+    and their resized variants so the same bytes always get the same name.
+    """
+    digest = hashlib.sha256()
+    if isinstance(content, bytes):
+        digest.update(content)
+        return digest.hexdigest()[:HASH_LENGTH]
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in iter(lambda: content.read(chunk_size), b''):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that names every file after the sha256 of its bytes.
+
+    Uploading the same bytes twice returns the existing file instead of
+    writing a copy with a random suffix.
+    """
+
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, content_hash(content) + ext).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def book_image_storage():
+    # فقط migration 0063 به این مسیر اشاره می‌کند؛ مدل از accounts.models.book_image_storage استفاده می‌کند
+    return storages['book_images']
+
+
+try:
+    import brotli
+except ImportError:  # brotli اختیاری است؛ بدون آن فقط نسخه‌ی gzip ساخته می‌شود
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml',
+                           '.ttf', '.otf', '.eot', '.ico')
+STATIC_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+
+
+def compress(data):
+    variants = {'gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes ``.gz`` and ``.br`` siblings.
+
+    Only hashed copies of text-like assets are compressed, and a sibling is
+    kept only when it is noticeably smaller than the original.
+    """
+
+    min_size = 256
+    max_ratio = 0.95
+
+    def url_converter(self, name, hashed_files, template=None):
+        # ارجاع CSS به فایلی که وجود ندارد (در بسته‌های جانبی) نباید کل collectstatic را متوقف کند
+        converter = super().url_converter(name, hashed_files, template)
+
+        def safe_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+
+        return safe_converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for hashed_name in sorted(hashed_names):
+            if hashed_name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < self.min_size:
+            return
+        for ext, compressed in compress(data).items():
+            if len(compressed) > len(data) * self.max_ratio:
+                continue
+            target = f'{name}.{ext}'
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
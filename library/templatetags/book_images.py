@@ -0,0 +1,42 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from library.images import VARIANT_WIDTHS, variant_url
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 576px) 50vw, (max-width: 992px) 33vw, 25vw'
+
+
+def _original_url(book):
+    url = getattr(book, 'image_url', None)
+    if url is None:
+        url = book.image.url if book.image else ''
+    return url or static('images/default-book.png')
+
+
+@register.simple_tag
+def book_image(book, css_class='', sizes=DEFAULT_SIZES):
+    """
+    Render ``<picture>`` with WebP and JPEG ``srcset`` for a Book or BookCard.
+
+    Falls back to a plain ``<img>`` of the original upload when the variants
+    have not been generated yet.
+    """
+    image_hash = getattr(book, 'image_hash', '')
+    if not image_hash:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">',
+                           _original_url(book), book.title, css_class)
+
+    def srcset(ext):
+        return ', '.join(f'{variant_url(image_hash, width, ext)} {width}w' for width in VARIANT_WIDTHS)
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy">'
+        '</picture>',
+        srcset('webp'), sizes,
+        variant_url(image_hash, VARIANT_WIDTHS[1], 'jpg'), srcset('jpg'), sizes, book.title, css_class,
+    )
@@ -1,18 +1,27 @@
 
 
 from django.urls import path , include
-from . import views
+from rest_framework.routers import DefaultRouter
+from . import api, views
 
 app_name = 'library'
 
+router = DefaultRouter()
+router.register('books', api.BookViewSet, basename='api-book')
+router.register('authors', api.AuthorViewSet, basename='api-author')
+router.register('genres', api.GenreViewSet, basename='api-genre')
+router.register('publishers', api.PublisherViewSet, basename='api-publisher')
+
 urlpatterns = [
 
     path('', views.home, name='home'),
     path("library/", views.library, name="library"),
     path("books/", views.Books, name="books"),
+    path("autocomplete/", views.autocomplete, name="autocomplete"),
     path("cart/", views.cart, name="cart"),
     path('add-to-cart/<int:book_id>/', views.add_to_cart, name='add_to_cart'),
     path('update-cart/', views.update_cart, name='update_cart'),
+    path('cart/batch/', views.batch_update_cart, name='batch_update_cart'),
     path('remove-from-cart/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('checkout/', views.checkout, name='checkout'),
     path('error_page/', views.error_page, name='error_page'),
@@ -20,6 +29,8 @@ urlpatterns = [
     path('payment/<int:order_id>/', views.payment, name='payment'),
     path('process-payment/<int:order_id>/<str:email>/', views.process_payment, name='process_payment'),
     path('order/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('export/<str:dataset>/', views.export_data, name='export'),
+    path('api/', include(router.urls)),
 
 
 ]
\ No newline at end of file
@@ -1,39 +1,120 @@
 import json
 import logging
 from datetime import timedelta
+from urllib.parse import urlencode
 from django.http import (HttpResponse, HttpResponseForbidden,
-                        JsonResponse, HttpResponseBadRequest)
+                        JsonResponse, HttpResponseBadRequest, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.urls import reverse
 from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib.auth.decorators import login_required
-from django.db import transaction, models
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connection, transaction
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
+from django.views.static import serve
 from django_recaptcha.fields import ReCaptchaField
 from django_ratelimit.decorators import ratelimit
 from rest_framework.throttling import UserRateThrottle
 
-from accounts.models import (Book, Genre, qoute, CartItem, Delivery,
-                           Order, OrderItem, User, Author, Cart)
+from accounts.models import (Book, Genre, CartItem, Delivery,
+                           Order, OrderItem, User, BookCard)
+from . import recommendations, sales
+from .autocomplete import suggest
+from .cache import cached_section, catalog_condition
+from .carts import (CartOperationError, SessionCart, add_item, apply_operations, cart_summary,
+                    user_cart)
+from .exports import FORMATS, ExportError, export_queryset, parse_date, stream_export
+from .facets import filter_books, get_facets, normalize_filters
+from .pagination import KeysetPaginator
+from .quotes import pick_quote
+from .search import BookSearch
+from .storage import is_hashed_name
 
 logger = logging.getLogger(__name__)
 
 
+GENRE_TAB_LIMIT = 8
+GENRE_UNION_SIZE = 400
+BILLBOARD_LIMIT = 5
+OFFER_LIMIT = 8
+# ترتیب‌های صفحه‌ی کتاب‌ها؛ هر کدام با یک ایندکس روی BookCard پوشش داده می‌شود
+BOOK_SORTS = {
+    'newest': ('-year_published', '-book_id'),
+    'discount': ('-discount_percent', '-book_id'),
+    'price': ('effective_price', 'book_id'),
+    '-price': ('-effective_price', '-book_id'),
+}
+
+
+def _genre_book_ids(genre_ids, limit):
+    # برای هر ژانر یک زیرکوئری با LIMIT که فقط چند ردیف از ایندکس (ژانر، سال، id) می‌خواند؛
+    # SQLite حداکثر ۵۰۰ بخش در یک UNION می‌پذیرد
+    part = (f'SELECT * FROM (SELECT book_id FROM {Book._meta.db_table} WHERE genre_id = %s '
+            f'ORDER BY year_published DESC, book_id DESC LIMIT %s)')
+    ids = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(genre_ids), GENRE_UNION_SIZE):
+            chunk = genre_ids[start:start + GENRE_UNION_SIZE]
+            cursor.execute(' UNION ALL '.join([part] * len(chunk)),
+                           [value for genre_id in chunk for value in (genre_id, limit)])
+            ids.extend(row[0] for row in cursor.fetchall())
+    return ids
+
+
+def build_genre_groups(genres, limit=GENRE_TAB_LIMIT):
+    ids = _genre_book_ids([genre.pk for genre in genres], limit)
+    books = Book.objects.select_related('author', 'genre').in_bulk(ids)
+    grouped = {}
+    for pk in ids:
+        book = books[pk]
+        grouped.setdefault(book.genre_id, []).append(book)
+    return [{'genre': genre, 'books': grouped.get(genre.pk, [])} for genre in genres]
+
+
+@catalog_condition
 def home(request):
-    best_sellers = Book.objects.filter(status="sold").order_by("-price")[:1]
-    featured_books = Book.objects.filter(featured="featured").order_by("-year_published")[:4]
-    popular_books = Book.objects.filter(featured="popular").order_by("-year_published")[:4]
+    # هر بخش جداگانه کش می‌شود و فقط وقتی مدل‌های وابسته‌اش تغییر کنند دوباره ساخته می‌شود
+    best_sellers = sales.best_sellers(days=30, limit=1)
+    featured_books = cached_section(
+        'featured_books', ('book', 'author'),
+        lambda: list(Book.objects.select_related('author').filter(featured="featured").order_by("-year_published")[:4]),
+    )
+    popular_books = cached_section(
+        'popular_books', ('book', 'author'),
+        lambda: list(Book.objects.select_related('author').filter(featured="popular").order_by("-year_published")[:4]),
+    )
 
     # Get distinct genres, ensuring they are ordered correctly
-    genres = Genre.objects.all()
+    genres = cached_section('genres', ('genre',), lambda: list(Genre.objects.all()))
 
     # Handle genre filtering (case-insensitive)
     selected_genre = request.GET.get("genre", "").strip()
-    books = Book.objects.all()
-    random_quote = qoute.objects.order_by('?').first()
+    books = cached_section(
+        'books', ('book', 'author'),
+        lambda: list(Book.objects.select_related('author').order_by('-year_published', '-book_id')[:BILLBOARD_LIMIT]),
+    )
+    latest_books = cached_section(
+        'latest_books', ('book', 'author'),
+        lambda: list(Book.objects.select_related('author').order_by('-year_published', '-book_id')[:GENRE_TAB_LIMIT]),
+    )
+    genre_groups = cached_section(
+        'genre_groups', ('book', 'author', 'genre'),
+        lambda: build_genre_groups(genres),
+    )
+    offer_books = cached_section(
+        'offer_books', ('book', 'author'),
+        lambda: list(BookCard.objects.filter(discount_percent__gt=0).order_by('-discount_percent', '-book_id')[:OFFER_LIMIT]),
+    )
+    random_quote = pick_quote()
+
+    # پاسخ کاربران ناشناس با ETag کش می‌شود، پس پیشنهادهای شخصی فقط برای کاربر واردشده است
+    also_bought = []
+    if request.user.is_authenticated:
+        cart_books = CartItem.objects.filter(cart__user=request.user).values_list('product_id', flat=True)
+        also_bought = recommendations.also_bought(cart_books)
 
     return render(
         request,
@@ -43,9 +124,13 @@ def home(request):
             "popular_books": popular_books,
             "selected_genre": selected_genre,
             "genres": genres,
+            "latest_books": latest_books,
+            "genre_groups": genre_groups,
+            "offer_books": offer_books,
             "featured_books": featured_books,
             "best_sellers": best_sellers,
             'random_quote': random_quote,
+            'also_bought': also_bought,
         },
     )
 
@@ -94,46 +179,29 @@ def library(request):
 
 @require_POST
 def add_to_cart(request, book_id):
-    if not request.user.is_authenticated:
-        return JsonResponse({'success': False, 'error': 'برای افزودن به سبد خرید ابتدا وارد شوید.'}, status=401)
-
     try:
-        if not request.session.session_key:
-            request.session.save()
-
-        book = get_object_or_404(Book, pk=book_id)
-
-        cart, _ = Cart.objects.get_or_create(
-            user=request.user,
-            session_key=request.session.session_key,
-        )
-
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=book,
-            defaults={
-                'quantity': models.F('quantity') + 1 if not created else 1,
-                'owned': False,
-            }
-        )
-        print(f"Cart item created: {created}, Quantity: {cart_item.quantity}")
-
-        if not created:
-            cart_item.quantity += 1
-            cart_item.save()
+        cart = get_cart_for_request(request)
+        # درج یا افزایش تعداد با یک upsert اتمیک؛ دوبار کلیک هم‌زمان هیچ افزایشی را گم نمی‌کند
+        # مهمان‌ها در سبد کوکی می‌خرند که بعد از ورود به سبدشان منتقل می‌شود
+        added = add_item(cart, book_id)
+        if added is None:
+            return JsonResponse({'success': False, 'error': 'کتاب مورد نظر یافت نشد'}, status=404)
+        quantity, cart_count = added
 
         return JsonResponse({
             'success': True,
-            'cart_count': cart.items.count(),
+            'cart_count': cart_count,
+            'quantity': quantity,
             'message': 'کتاب با موفقیت به سبد خرید اضافه شد'
         })
 
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+@catalog_condition
 def product_list(request):
     # Fetch all products
-    books = Book.objects.all()
+    books = BookCard.objects.order_by('-year_published', '-book_id')
     return render(request, 'library/product_list.html', {'products': books})
 
 
@@ -153,69 +221,41 @@ def product_list(request):
 
 def get_cart_for_request(request):
     if request.user.is_authenticated:
-        # فقط یک سبد آخر رو می‌گیریم
-        cart = Cart.objects.filter(user=request.user).order_by('-created_at').first()
-        if not cart:
-            cart = Cart.objects.create(user=request.user)
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        session_key = request.session.session_key
-
-        cart = Cart.objects.filter(session_key=session_key).order_by('-created_at').first()
-        if not cart:
-            cart = Cart.objects.create(session_key=session_key)
-
-    return cart
+        return user_cart(request.user)
+    # سبد مهمان فقط در کوکی امضاشده است؛ نه ردیف Cart ساخته می‌شود نه session
+    return SessionCart.from_request(request)
 
 def cart(request):
     cart = get_cart_for_request(request)
-    cart_items = cart.items.all()
-
-    total_price = sum(item.total_price for item in cart_items)
-    total_items = cart_items.count()
 
     # تلاش برای گرفتن روش ارسال انتخاب شده
     delivery_method_id = request.session.get('delivery_method', None)
-    delivery_cost = 0
-    total_price_with_delivery = total_price
-
-    # مدیریت ارسال فرم در صورت POST
     if request.method == 'POST':
         delivery_method_id = request.POST.get('delivery_method')
-        if delivery_method_id:
-            try:
-                delivery_method = Delivery.objects.get(id=delivery_method_id)
-                delivery_cost = delivery_method.price
-                total_price_with_delivery = total_price + delivery_cost
-
-                # ذخیره اطلاعات در session
-                request.session['delivery_method'] = delivery_method_id
-                request.session['delivery_cost'] = float(delivery_cost)
-                request.session['total_price_with_delivery'] = float(total_price_with_delivery)
-
-                messages.success(request, "روش تحویل با موفقیت به‌روز شد")
-            except Delivery.DoesNotExist:
-                messages.error(request, "روش تحویل انتخاب شده معتبر نیست")
-        else:
+        if not delivery_method_id:
             messages.error(request, "لطفاً یک روش تحویل انتخاب کنید.")
 
-    elif delivery_method_id:
-        try:
-            delivery_method = Delivery.objects.get(id=delivery_method_id)
-            delivery_cost = delivery_method.price
-            total_price_with_delivery = total_price + delivery_cost
-        except Delivery.DoesNotExist:
-            messages.error(request, "روش تحویل انتخابی معتبر نیست.")
+    # اقلام، جمع کل و هزینه‌ی ارسال با یک کوئری
+    summary = cart_summary(cart, delivery_method_id)
+
+    if delivery_method_id and summary.delivery_cost is None:
+        messages.error(request, "روش تحویل انتخاب شده معتبر نیست")
+    elif request.method == 'POST' and delivery_method_id:
+        # ذخیره اطلاعات در session
+        request.session['delivery_method'] = delivery_method_id
+        request.session['delivery_cost'] = float(summary.delivery_cost)
+        request.session['total_price_with_delivery'] = float(summary.total)
+        messages.success(request, "روش تحویل با موفقیت به‌روز شد")
 
     context = {
-        'cart_items': cart_items,
-        'total_price': total_price,
-        'total_items': total_items,
+        'cart_items': summary.items,
+        'total_price': summary.subtotal,
+        'total_items': summary.count,
         'Delivery_methods': Delivery.objects.all(),
         'selected_delivery_method': delivery_method_id,
-        'delivery_cost': delivery_cost,
-        'total_price_with_delivery': total_price_with_delivery,
+        'delivery_cost': summary.delivery_cost or 0,
+        'total_price_with_delivery': summary.total,
+        'also_bought': recommendations.also_bought(item.product_id for item in summary.items),
     }
 
     return render(request, 'library/cart.html', context)
@@ -223,15 +263,10 @@ def cart(request):
 
 
 def remove_from_cart(request, item_id):
-    cart_item = get_object_or_404(CartItem, id=item_id)
-
-    # اطمینان از اینکه فقط آیتم‌های سبد خرید فعلی حذف می‌شن
+    # فقط آیتم‌های سبد خرید فعلی حذف می‌شن
     cart = get_cart_for_request(request)
-    if cart_item.cart != cart:
-        return redirect('library:cart')
-
-    cart_item.delete()
-    messages.success(request, "آیتم از سبد خرید حذف شد.")
+    if apply_operations(cart, [{'cart_item_id': item_id, 'remove': True}]):
+        messages.success(request, "آیتم از سبد خرید حذف شد.")
     return redirect('library:cart')
 
 
@@ -339,6 +374,33 @@ def remove_from_cart(request, item_id):
 #         return JsonResponse({'status': 'error', 'message': 'Internal server error'}, status=500)
 
 
+@require_POST
+def batch_update_cart(request):
+    # چند تغییر پشت سر هم (کلیک‌های +/-) در یک درخواست و یک تراکنش اعمال می‌شوند
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    operations = payload.get('operations') if isinstance(payload, dict) else payload
+
+    cart = get_cart_for_request(request)
+    try:
+        removed = apply_operations(cart, operations)
+    except CartOperationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    summary = cart_summary(cart, request.session.get('delivery_method'))
+    return JsonResponse({
+        'status': 'success',
+        'items': [
+            {'cart_item_id': item.pk, 'quantity': item.quantity, 'total_price': str(item.line_total)}
+            for item in summary.items
+        ],
+        'removed': removed,
+        'cart': summary.as_dict(),
+    })
+
+
 @require_POST
 def update_cart(request):
     try:
@@ -350,50 +412,33 @@ def update_cart(request):
         if not cart_item_id or action not in ['increase', 'decrease']:
             return JsonResponse({'status': 'error', 'message': 'Invalid data'}, status=400)
 
-        # یافتن سبد خرید
-        if request.user.is_authenticated:
-            carts = Cart.objects.filter(user=request.user)
-        else:
-            if not request.session.session_key:
-                request.session.create()
-            carts = Cart.objects.filter(session_key=request.session.session_key)
-
-        if not carts.exists():
-            return JsonResponse({'status': 'error', 'message': 'Cart not found'}, status=404)
-
-        # اگر چند سبد خرید وجود دارد، فقط اولی را نگه دارید
-        if carts.count() > 1:
-            # حذف سبدهای اضافی
-            main_cart = carts.first()
-            carts.exclude(id=main_cart.id).delete()
-        else:
-            main_cart = carts.first()
-
-        # یافتن CartItem
-        cart_item = get_object_or_404(CartItem, id=cart_item_id, cart=main_cart)
-
-        # به‌روزرسانی مقدار
-        if action == 'increase':
-            cart_item.quantity += 1
-        elif action == 'decrease':
-            cart_item.quantity = max(1, cart_item.quantity - 1)
+        if not cart_item_id.isdigit():
+            return JsonResponse({'status': 'error', 'message': 'Invalid data'}, status=400)
 
-        cart_item.save()
+        # به‌روزرسانی مقدار (هرگز کمتر از یک) برای سبد کاربر یا سبد مهمان
+        main_cart = get_cart_for_request(request)
+        apply_operations(main_cart, [{'cart_item_id': int(cart_item_id),
+                                      'delta': 1 if action == 'increase' else -1}])
 
-        # محاسبه قیمت کل
-        total_price = sum(item.total_price for item in main_cart.items.all())
+        # قیمت ردیف و جمع کل از همان کوئری خلاصه‌ی سبد
+        summary = cart_summary(main_cart)
+        cart_item = next((item for item in summary.items if item.pk == int(cart_item_id)), None)
+        if cart_item is None:
+            return JsonResponse({'status': 'error', 'message': 'Cart item not found'}, status=404)
 
         return JsonResponse({
             'status': 'success',
             'new_quantity': cart_item.quantity,
-            'total_price': str(cart_item.total_price),
-            'product_id': cart_item.product.book_id,
-            'total_price_all': total_price
+            'total_price': str(cart_item.line_total),
+            'product_id': cart_item.product_id,
+            'total_price_all': summary.subtotal,
+            'cart': summary.as_dict(),
         })
 
+    except CartOperationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
     except Exception as e:
-        # چاپ دقیق‌تر خطا برای کمک به شناسایی مشکل
-        print(f"Error: {str(e)}")
+        logger.error(f"Update cart error: {str(e)}")
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 @ratelimit(key='ip', rate='3/m')
@@ -403,17 +448,15 @@ def update_cart(request):
 def checkout(request):
     try:
         cart = get_cart_for_request(request)
-        if not cart or not cart.items.exists():
+        summary = cart_summary(cart)
+        if not summary.count:
             messages.error(request, "سبد خرید شما خالی است")
             return redirect('library:cart')
 
-        # محاسبه جمع کل
-        total_price = sum(item.product.price * item.quantity for item in cart.items.all())
-
         # ایجاد سفارش با مقادیر پیش‌فرض
         order = Order.objects.create(
             user=request.user,
-            total_price=total_price or 0.00,  # تضمین مقدار پیش‌فرض
+            total_price=summary.subtotal,
             status='pending'
         )
 
@@ -421,10 +464,10 @@ def checkout(request):
         OrderItem.objects.bulk_create([
             OrderItem(
                 order=order,
-                product=item.product,
+                product_id=item.product_id,
                 quantity=item.quantity,
-                price=item.product.price
-            ) for item in cart.items.all()
+                price=item.product.price or 0
+            ) for item in summary.items
         ])
 
         return redirect('payment:process', order_id=order.id)
@@ -472,6 +515,56 @@ def payment_callback(request):
         messages.error(request, "خطایی در پردازش پرداخت رخ داد")
         return redirect('library:cart')
 
+def serve_media(request, path, document_root=None):
+    # فایل‌هایی که نامشان از محتوایشان ساخته شده هیچ‌وقت تغییر نمی‌کنند و می‌توانند برای همیشه کش شوند
+    response = serve(request, path, document_root=document_root)
+    if is_hashed_name(path):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def autocomplete(request):
+    try:
+        limit = max(1, int(request.GET.get('limit', 8)))
+    except ValueError:
+        limit = 8
+    results = suggest(request.GET.get('q', ''), limit)
+    books_url = reverse('library:books')
+    for item in results:
+        if item['type'] == 'author':
+            item['url'] = f"{books_url}?author={item['id']}"
+        else:
+            item['url'] = f"{books_url}?{urlencode({'q': item['label']})}"
+    response = JsonResponse({'results': results})
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+@staff_member_required
+def export_data(request, dataset):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest('invalid format')
+    compress = request.GET.get('gzip') == '1'
+    try:
+        queryset = export_queryset(
+            dataset,
+            since=parse_date(request.GET.get('since')),
+            until=parse_date(request.GET.get('until'), end=True),
+            statuses=request.GET.getlist('status'),
+        )
+    except ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    filename = f'{dataset}.{fmt}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(stream_export(queryset, fmt, compress),
+                                     content_type='application/gzip' if compress else FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # nginx پاسخ را پیش از ارسال بافر می‌کند؛ با این هدر بایت‌ها بلافاصله فرستاده می‌شوند
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def error_page(request):
     return render(request, 'library/error_page.html')
 
@@ -511,38 +604,54 @@ def order_detail(request, order_id):
     return render(request, 'library/order_detail.html', context)
 
 
+@catalog_condition
 def Books(request):
-    books = Book.objects.all()
-
     # فیلترها
-    author = request.GET.get('author')
-    genre = request.GET.get('genre')
-    year = request.GET.get('year')
-    status = request.GET.get('status')
-    popular = request.GET.get('popular')
-
-    if author:
-        books = books.filter(author_id=author)
-    if genre:
-        books = books.filter(genre_id=genre)
-    if year:
-        books = books.filter(year_published=year)
-    if status:
-        books = books.filter(status=status)
-    if popular:
-        books = books.filter(featured=popular)
-
-    # صفحه‌بندی
-    paginator = Paginator(books, 3)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    filters = normalize_filters(request.GET)
+    query = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort')
+    if sort not in BOOK_SORTS:
+        sort = 'newest'
+    ordering = BOOK_SORTS[sort]
+    books = filter_books(BookCard.objects.all(), filters)
+    if 'effective_price' in ordering:
+        # کتاب بدون قیمت در مرتب‌سازی قیمتی جایی ندارد (و کلید keyset نباید null باشد)
+        books = books.exclude(effective_price=None)
+    books = books.order_by(*ordering)
+
+    # جستجوی متنی از ایندکس FTS خوانده می‌شود و نتایج بر اساس رتبه مرتب می‌شوند
+    if query:
+        books = BookSearch(query, queryset=books if filters else None)
+
+    # صفحه‌بندی keyset با ?paging=keyset فعال می‌شود؛ هزینه‌ی هر صفحه به عمق آن بستگی ندارد
+    keyset = not query and (request.GET.get('paging') == 'keyset' or 'cursor' in request.GET)
+    if keyset:
+        paginator = KeysetPaginator(books, 3, ordering=ordering)
+        page_obj = paginator.get_page(request.GET.get('cursor'), with_count=request.GET.get('count') == '1')
+    else:
+        paginator = Paginator(books, 3)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+
+    base_query = request.GET.copy()
+    base_query.pop('cursor', None)
+    base_query.pop('page', None)
+    if keyset:
+        base_query['paging'] = 'keyset'
+
+    facets = get_facets(filters)
 
     return render(request, 'library/Books.html', {
-        'popular': ['popular', 'featured', 'normal'],
         'books': books,
         'page_obj': page_obj,
-        'genres': Genre.objects.all(),
-        'authors': Author.objects.all(),
-        'years': Book.objects.values_list('year_published', flat=True).distinct(),
-        'statuses': ['exist', 'sold', 'borrowed']
+        'query': query,
+        'filters': filters,
+        'sort': sort,
+        'keyset': keyset,
+        'base_query': base_query.urlencode(),
+        'genres': facets['genre'],
+        'authors': facets['author'],
+        'years': facets['year'],
+        'statuses': facets['status'],
+        'popular': facets['popular'],
     })
@@ -65,10 +65,12 @@ AUTHENTICATION_BACKENDS = [
 ]
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'library.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'library.middleware.SessionCartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +90,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'library.context_processors.cart',
             ],
         },
     },
@@ -105,6 +108,18 @@ DATABASES = {
     }
 }
 
+# کش مشترک بین همه‌ی workerها و دستورهای مدیریتی (شمارنده‌ی سبد، پیشنهادها و بخش‌های کاتالوگ)؛
+# نسخه‌ی کاتالوگ خودش در جدول CacheVersion است. در production می‌توان Redis/Memcached گذاشت
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
+# اگر True باشد نقل‌قول صفحه‌ی اصلی تا پایان روز ثابت می‌ماند
+QUOTE_OF_THE_DAY = False
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -139,6 +154,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+# در حالت production فایل‌ها با نام هش‌دار و نسخه‌های .gz/.br جمع‌آوری می‌شوند
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # تصاویر کتاب با هش محتوا نام‌گذاری می‌شوند (Book.image)
+    'book_images': {
+        'BACKEND': 'library.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                    else 'library.storage.CompressedManifestStaticFilesStorage'),
+    },
+}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -1,9 +1,9 @@
 
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from library_project import settings
 from accounts import views
+from library.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,4 +13,7 @@ urlpatterns = [
     path('payment/', include('payment.urls', namespace='payment'))
 ]
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
\ No newline at end of file